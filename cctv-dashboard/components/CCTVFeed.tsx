@@ -41,7 +41,15 @@ const CCTVFeed: React.FC<CCTVFeedProps> = ({
   const [lastDetectionCount, setLastDetectionCount] = useState<number>(0);
   const [isContinuousDetection, setIsContinuousDetection] = useState(false);
   const [isInitialAnalyzing, setIsInitialAnalyzing] = useState(false);
-  const intervalRef = useRef<NodeJS.Timeout | null>(null);
+  const detectionTimerRef = useRef<NodeJS.Timeout | null>(null);
+  const continuousRef = useRef<boolean>(false); // read inside timer callbacks
+  // The server recommends when to send the next frame (fast during incidents, slow when idle)
+  const defaultSampleMs = 3000;
+  const nextSampleMsRef = useRef<number>(defaultSampleMs);
+  // Frames older than this are useless; the server counts the budget from when it receives them
+  const maxFrameAgeMs = 5000;
+  const expiredFramesRef = useRef<number>(0);
+  const expiredFramesWarning = 3; // consecutive expired frames before the user is told
 
 // Email throttling and detection-edge tracking
   const lastEmailSentAtRef = useRef<number>(0);
@@ -290,7 +298,7 @@ const CCTVFeed: React.FC<CCTVFeedProps> = ({
         } else {
           resolve("");
         }
-      }, "image/png");
+      }, "image/jpeg", 0.85); // JPEG keeps server-side frame rings small and decodes faster
     });
   };
 
@@ -300,6 +308,7 @@ const CCTVFeed: React.FC<CCTVFeedProps> = ({
 
     try {
       // Capture current frame
+      const captureTs = Date.now();
       const screenshot = await captureFrame();
 
       if (!screenshot) {
@@ -313,15 +322,40 @@ const CCTVFeed: React.FC<CCTVFeedProps> = ({
         method: "POST",
         headers: {
           "Content-Type": "application/json",
+          "X-Camera-Id": camera?.id || cameraName,
         },
         body: JSON.stringify({
           image: screenshot,
           model: currentModel, // Use selected model
           confidence: 0.3, // Lower confidence threshold for more sensitive detection
+          camera_id: camera?.id || cameraName, // Per-camera admission stats
+          // Remaining budget rather than a timestamp, so browser clock skew can't expire every frame
+          max_age_ms: Math.max(0, maxFrameAgeMs - (Date.now() - captureTs)),
+          notify_email: notifyEmail, // Server coalesces and mails alerts
         }),
       });
 
       const result = await response.json();
+      nextSampleMsRef.current =
+        typeof result.next_sample_ms === "number" ? result.next_sample_ms : defaultSampleMs;
+
+      // Server is overloaded, the frame went stale or came too early - skip this frame quietly
+      if ((response.status === 429 || response.status === 503) && result.retry_after !== undefined) {
+        console.log(`⏳ AI server busy: ${result.error}`);
+        if (response.status === 503) {
+          expiredFramesRef.current += 1;
+          if (expiredFramesRef.current >= expiredFramesWarning) {
+            setError(
+              `AI server is dropping frames as stale (${expiredFramesRef.current} in a row) - it may be overloaded`
+            );
+          }
+        }
+        return;
+      }
+      if (expiredFramesRef.current >= expiredFramesWarning) {
+        setError("");
+      }
+      expiredFramesRef.current = 0;
 
       if (result.success && result.detections && result.detections.length > 0) {
         console.log(
@@ -343,7 +377,8 @@ const CCTVFeed: React.FC<CCTVFeedProps> = ({
             confidence,
             timestamp: new Date().toISOString(),
             location: cameraName,
-            screenshot: result.annotated_image || screenshot,
+            // Server stores snapshots and returns a cacheable URL instead of base64
+            screenshot: result.snapshot_url || result.annotated_image || screenshot,
             severity,
           };
 
@@ -368,8 +403,15 @@ const CCTVFeed: React.FC<CCTVFeedProps> = ({
           );
         });
 
-        // After processing, decide email for the best detection
-        if (topDetection && notifyEmail) {
+        // After processing, decide email for the best detection.
+        // The Python server dispatches (coalesced) alerts itself when it can.
+        // "refused" means it won't mail our address (not allowlisted), so we send it ourselves.
+        if (result.alert_dispatch === "server") {
+          detectionActiveRef.current = true;
+        } else if (topDetection && notifyEmail) {
+          if (result.alert_dispatch === "refused") {
+            console.log(`📧 Server won't mail ${notifyEmail}, sending the alert from the dashboard`);
+          }
           const td = topDetection as DetectionData;
           console.log(`📧 Deciding email for detection id=${td.id}`);
           // const decision = shouldSendEmail(td);
@@ -408,9 +450,8 @@ const CCTVFeed: React.FC<CCTVFeedProps> = ({
 
       // Clear error after 5 seconds
       setTimeout(() => setError(""), 5000);
+      nextSampleMsRef.current = defaultSampleMs;
     } finally {
-      // Wait for 2 seconds after getting response before allowing next detection
-      await new Promise((resolve) => setTimeout(resolve, 2000));
       setIsDetecting(false);
     }
   };
@@ -427,15 +468,18 @@ const CCTVFeed: React.FC<CCTVFeedProps> = ({
       setIsInitialAnalyzing(false);
     }, 3000);
 
-    // Start with immediate detection
-    performAiDetection();
+    // Start with immediate detection, then follow the server's recommended interval
+    continuousRef.current = true;
+    nextSampleMsRef.current = defaultSampleMs;
+    runContinuousDetection();
+  };
 
-    // Set up interval for continuous detection (every 3 seconds)
-    intervalRef.current = setInterval(() => {
-      if (!isDetecting) {
-        performAiDetection();
-      }
-    }, 3000);
+  const runContinuousDetection = async () => {
+    if (!continuousRef.current) return;
+    await performAiDetection();
+    if (continuousRef.current) {
+      detectionTimerRef.current = setTimeout(runContinuousDetection, nextSampleMsRef.current);
+    }
   };
 
   const stopContinuousDetection = () => {
@@ -445,17 +489,19 @@ const CCTVFeed: React.FC<CCTVFeedProps> = ({
     setIsInitialAnalyzing(false); // Reset initial analyzing state
     console.log("⏹️ Stopping continuous AI detection...");
 
-    if (intervalRef.current) {
-      clearInterval(intervalRef.current);
-      intervalRef.current = null;
+    continuousRef.current = false;
+    if (detectionTimerRef.current) {
+      clearTimeout(detectionTimerRef.current);
+      detectionTimerRef.current = null;
     }
   };
 
-  // Cleanup interval on unmount
+  // Cleanup timer on unmount
   useEffect(() => {
     return () => {
-      if (intervalRef.current) {
-        clearInterval(intervalRef.current);
+      continuousRef.current = false;
+      if (detectionTimerRef.current) {
+        clearTimeout(detectionTimerRef.current);
       }
     };
   }, []);
@@ -518,7 +564,7 @@ const CCTVFeed: React.FC<CCTVFeedProps> = ({
     if (screenshot) {
       const link = document.createElement("a");
       link.href = screenshot;
-      link.download = `${cameraName}-frame.png`;
+      link.download = `${cameraName}-frame.jpg`;
       document.body.appendChild(link);
       link.click();
       document.body.removeChild(link);
@@ -1,7 +1,15 @@
 import type { NextConfig } from "next";
 
+const DETECT_SERVER_URL = (process.env.DETECT_SERVER_URL || "http://localhost:5000").replace(/\/+$/, "");
+
 const nextConfig: NextConfig = {
-  /* config options here */
+  // Snapshot and clip links from the detection server are root-relative, so serve them from here
+  async rewrites() {
+    return [
+      { source: "/snapshots/:path*", destination: `${DETECT_SERVER_URL}/snapshots/:path*` },
+      { source: "/api/clips/:path*", destination: `${DETECT_SERVER_URL}/api/clips/:path*` },
+    ];
+  },
 };
 
 export default nextConfig;
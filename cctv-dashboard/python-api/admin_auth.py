@@ -0,0 +1,35 @@
+"""
+Access control for the /admin endpoints.
+
+Set ADMIN_TOKEN and send it as ``Authorization: Bearer <token>`` (or
+``X-Admin-Token``). Without ADMIN_TOKEN the admin endpoints only answer
+requests from the local machine.
+"""
+import hmac
+import os
+from functools import wraps
+
+from flask import request, jsonify
+
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+
+def _token_from_request():
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        return auth[len('Bearer '):]
+    return request.headers.get('X-Admin-Token', '')
+
+
+def require_admin(view):
+    """Decorator that rejects non-admin callers with 401/403"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = os.environ.get('ADMIN_TOKEN')
+        if token:
+            if not hmac.compare_digest(_token_from_request(), token):
+                return jsonify({'success': False, 'error': 'Admin token required'}), 401
+        elif request.remote_addr not in LOCAL_ADDRESSES:
+            return jsonify({'success': False, 'error': 'Admin endpoints are local-only without ADMIN_TOKEN'}), 403
+        return view(*args, **kwargs)
+    return wrapper
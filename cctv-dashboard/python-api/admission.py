@@ -0,0 +1,201 @@
+"""
+Admission control for the detection server.
+
+Keeps a bounded number of requests in flight and a bounded wait queue in
+front of them. Requests that cannot be queued are rejected immediately, and
+requests whose deadline passes (on arrival or while waiting) are dropped
+before any image decoding happens.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+# Defaults (tune for the box the server runs on)
+MAX_CONCURRENT = 2        # requests allowed to run inference at the same time
+MAX_QUEUE = 8             # requests allowed to wait for a free slot
+DEFAULT_MAX_AGE = 5.0     # seconds a frame stays useful when the client sends no deadline
+RETRY_AFTER = 1           # seconds suggested to rejected clients
+MAX_CAMERAS = 1024        # per-camera entries kept (camera ids come from clients)
+CAMERA_IDLE_SECONDS = 600.0  # entries of cameras not seen for this long are dropped
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is refused by the admission controller"""
+
+    def __init__(self, reason, status_code, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _to_seconds(value):
+    """Convert a client timestamp (epoch ms or epoch s) to epoch seconds"""
+    if value is None or value == '':
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    # Browsers send Date.now() in milliseconds
+    return value / 1000.0 if value > 1e11 else value
+
+
+def parse_deadline(headers, data, max_age=DEFAULT_MAX_AGE, received_at=None):
+    """Work out the absolute deadline (epoch seconds) for a request.
+
+    A relative budget is preferred because it does not depend on the
+    client's clock: ``X-Max-Age-Ms`` header or ``max_age_ms`` field, counted
+    from when the server received the request. An explicit deadline
+    (``X-Deadline`` header or ``deadline`` field) or a capture timestamp
+    (``X-Capture-Timestamp`` header or ``capture_ts`` field) plus ``max_age``
+    are still accepted from clients with synchronised clocks. Returns None
+    when the client sent none of these.
+    """
+    data = data or {}
+    received_at = time.time() if received_at is None else received_at
+
+    budget = headers.get('X-Max-Age-Ms') or data.get('max_age_ms')
+    if budget is not None and budget != '':
+        try:
+            return received_at + max(float(budget), 0.0) / 1000.0
+        except (TypeError, ValueError):
+            pass
+
+    deadline = _to_seconds(headers.get('X-Deadline') or data.get('deadline'))
+    if deadline is not None:
+        return deadline
+
+    capture_ts = _to_seconds(headers.get('X-Capture-Timestamp') or data.get('capture_ts'))
+    if capture_ts is not None:
+        return capture_ts + max_age
+
+    return None
+
+
+def parse_camera_id(headers, data):
+    """Get the camera id from the ``X-Camera-Id`` header or ``camera_id`` field"""
+    data = data or {}
+    return str(headers.get('X-Camera-Id') or data.get('camera_id') or 'unknown')
+
+
+class CameraTable:
+    """Per-camera entries bounded by idle expiry and a maximum count.
+
+    Camera ids are client-supplied, so anything keyed by them must not grow
+    without limit. Not thread-safe: callers hold their own lock.
+    """
+
+    def __init__(self, factory, max_cameras=MAX_CAMERAS, idle_seconds=CAMERA_IDLE_SECONDS):
+        self._factory = factory
+        self.max_cameras = max_cameras
+        self.idle_seconds = idle_seconds
+        self._entries = OrderedDict()   # camera_id -> [last_seen, value], least recently seen first
+
+    def get(self, camera_id, now=None):
+        """The camera's entry, created (after expiring old ones) if needed"""
+        now = time.time() if now is None else now
+        entry = self._entries.get(camera_id)
+        if entry is None:
+            self._expire(now)
+            entry = self._entries[camera_id] = [now, self._factory()]
+        else:
+            entry[0] = now
+            self._entries.move_to_end(camera_id)
+        return entry[1]
+
+    def peek(self, camera_id):
+        """The camera's entry or None, without creating or touching it"""
+        entry = self._entries.get(camera_id)
+        return None if entry is None else entry[1]
+
+    def items(self):
+        return [(camera_id, value) for camera_id, (_, value) in self._entries.items()]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expire(self, now):
+        cutoff = now - self.idle_seconds
+        while self._entries:
+            last_seen, _ = next(iter(self._entries.values()))
+            if last_seen >= cutoff and len(self._entries) < self.max_cameras:
+                break
+            self._entries.popitem(last=False)
+
+
+class AdmissionController:
+    """Bounded in-flight slots plus a bounded wait queue with deadlines"""
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT, max_queue=MAX_QUEUE,
+                 retry_after=RETRY_AFTER):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._stats = CameraTable(lambda: {'admitted': 0, 'rejected': 0, 'expired': 0})
+
+    def acquire(self, camera_id, deadline=None):
+        """Wait for a free slot or raise AdmissionRejected"""
+        with self._cond:
+            now = time.time()
+            if deadline is not None and deadline <= now:
+                self._stats.get(camera_id)['expired'] += 1
+                raise AdmissionRejected('Frame deadline already passed', 503, self.retry_after)
+
+            if self._active < self.max_concurrent:
+                self._active += 1
+                self._stats.get(camera_id)['admitted'] += 1
+                return
+
+            if self._waiting >= self.max_queue:
+                self._stats.get(camera_id)['rejected'] += 1
+                raise AdmissionRejected('Server busy, queue is full', 429, self.retry_after)
+
+            self._waiting += 1
+            try:
+                while self._active >= self.max_concurrent:
+                    timeout = None if deadline is None else deadline - time.time()
+                    if timeout is not None and timeout <= 0:
+                        self._stats.get(camera_id)['expired'] += 1
+                        raise AdmissionRejected('Frame deadline passed while queued', 503,
+                                                self.retry_after)
+                    self._cond.wait(timeout)
+            finally:
+                self._waiting -= 1
+
+            self._active += 1
+            self._stats.get(camera_id)['admitted'] += 1
+
+    def release(self):
+        """Free a slot and wake up the next waiting request"""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    def check_deadline(self, camera_id, deadline):
+        """Drop an admitted request whose deadline has passed (call before decode)"""
+        if deadline is not None and deadline <= time.time():
+            with self._cond:
+                self._stats.get(camera_id)['expired'] += 1
+            raise AdmissionRejected('Frame deadline passed before decode', 503, self.retry_after)
+
+    def load(self, exclude=0):
+        """Fraction of slots and queue places in use (0.0 - 1.0), leaving out ``exclude`` requests"""
+        with self._cond:
+            in_use = max(self._active + self._waiting - exclude, 0)
+            return in_use / (self.max_concurrent + self.max_queue)
+
+    def stats(self):
+        """Snapshot of queue state and per-camera counters"""
+        with self._cond:
+            return {
+                'active': self._active,
+                'waiting': self._waiting,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'cameras': {camera: dict(counts) for camera, counts in self._stats.items()}
+            }
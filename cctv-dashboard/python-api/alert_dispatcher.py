@@ -0,0 +1,260 @@
+"""
+Server-side alert dispatcher for weapon detections.
+
+The first detection of a new camera/class incident is mailed right away;
+the detections that follow are coalesced over a short window and reported
+when it closes. Incidents are batched per recipient with a minimum interval
+between mails, and delivery happens on a background thread with retries,
+so SMTP never runs on the request path.
+
+Configuration (environment variables):
+    ALERT_SMTP_HOST / ALERT_SMTP_PORT   SMTP server (default localhost:1025)
+    ALERT_SMTP_USER / ALERT_SMTP_PASSWORD
+    ALERT_SMTP_TLS                      "1" to use STARTTLS
+    ALERT_FROM                          sender address
+    ALERT_RECIPIENTS                    comma-separated default recipients
+    ALERT_ALLOWED_RECIPIENTS            comma-separated addresses (or "@domain") clients
+                                        may ask to notify; defaults are always allowed
+
+For local testing run an SMTP stand-in that prints every mail:
+    pip install aiosmtpd
+    python -m aiosmtpd -n -l localhost:1025
+"""
+import logging
+import os
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+COALESCE_WINDOW = 30.0     # seconds of follow-up detections merged into one incident
+RECIPIENT_INTERVAL = 60.0  # minimum seconds between two mails to the same recipient
+MAX_PENDING = 200          # incidents queued per recipient; the oldest are dropped beyond this
+MAX_ATTEMPTS = 5           # delivery attempts before a mail is dropped
+RETRY_BASE_DELAY = 2.0     # seconds, doubled after every failed attempt
+
+
+class Incident:
+    """Detections of one class on one camera within a coalescing window"""
+
+    def __init__(self, camera_id, class_name, now):
+        self.camera_id = camera_id
+        self.class_name = class_name
+        self.first_seen = now
+        self.last_seen = now
+        self.count = 0
+        self.max_confidence = 0.0
+        self.snapshot = None
+        self.recipients = set()
+        self.mailed = {}       # recipient -> detection count included in the last mail
+
+    def add(self, confidence, snapshot, recipients, now):
+        self.count += 1
+        self.last_seen = now
+        self.recipients.update(recipients)
+        # Keep the snapshot of the most confident detection
+        if confidence >= self.max_confidence:
+            self.max_confidence = confidence
+            if snapshot is not None:
+                self.snapshot = snapshot
+
+
+class AlertDispatcher:
+    """Coalesces detections into incidents and mails them from a worker thread"""
+
+    def __init__(self, smtp_host='localhost', smtp_port=1025, sender='cctv-alerts@localhost',
+                 default_recipients=(), allowed_recipients=(), smtp_user=None, smtp_password=None,
+                 use_tls=False, coalesce_window=COALESCE_WINDOW, recipient_interval=RECIPIENT_INTERVAL):
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        self.sender = sender
+        self.default_recipients = [r for r in default_recipients if r]
+        self.allowed_recipients = {r.lower() for r in allowed_recipients if r} | \
+            {r.lower() for r in self.default_recipients}
+        self.smtp_user = smtp_user
+        self.smtp_password = smtp_password
+        self.use_tls = use_tls
+        self.coalesce_window = coalesce_window
+        self.recipient_interval = recipient_interval
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._incidents = {}       # (camera_id, class_name) -> open Incident
+        self._pending = {}         # recipient -> [Incident] waiting to be mailed
+        self._next_allowed = {}    # recipient -> earliest time of the next mail
+        self._retries = []         # [(due_time, attempt, recipient, [Incident])]
+        self._thread = None
+        self.stats = {'submitted': 0, 'incidents': 0, 'sent': 0, 'failed': 0, 'dropped': 0,
+                      'incidents_dropped': 0, 'recipients_refused': 0}
+
+    @classmethod
+    def from_env(cls):
+        """Build a dispatcher from the ALERT_* environment variables"""
+        recipients = os.environ.get('ALERT_RECIPIENTS', '').split(',')
+        allowed = os.environ.get('ALERT_ALLOWED_RECIPIENTS', '').split(',')
+        return cls(
+            smtp_host=os.environ.get('ALERT_SMTP_HOST', 'localhost'),
+            smtp_port=int(os.environ.get('ALERT_SMTP_PORT', '1025')),
+            sender=os.environ.get('ALERT_FROM', 'cctv-alerts@localhost'),
+            default_recipients=[r.strip() for r in recipients],
+            allowed_recipients=[r.strip() for r in allowed],
+            smtp_user=os.environ.get('ALERT_SMTP_USER'),
+            smtp_password=os.environ.get('ALERT_SMTP_PASSWORD'),
+            use_tls=os.environ.get('ALERT_SMTP_TLS') == '1',
+        )
+
+    def start(self):
+        """Start the background delivery thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='alert-dispatcher', daemon=True)
+            self._thread.start()
+
+    def allowed(self, recipient):
+        """True if clients may ask for alerts to go to ``recipient``"""
+        recipient = recipient.lower()
+        domain = recipient[recipient.rfind('@'):] if '@' in recipient else None
+        return recipient in self.allowed_recipients or domain in self.allowed_recipients
+
+    def enabled(self, recipient=None):
+        """True if detections for ``recipient`` (plus the defaults) would be mailed"""
+        return bool((recipient and self.allowed(recipient)) or self.default_recipients)
+
+    def submit(self, camera_id, detections, snapshot=None, recipient=None):
+        """Record ``(class_name, confidence)`` detections for later delivery.
+
+        Returns True if anyone will be notified (a refused ``recipient`` is
+        not, see ``allowed``). Cheap enough to call on the
+        request path: it only merges the detections into open incidents
+        under a lock.
+        """
+        recipients = set(self.default_recipients)
+        if recipient:
+            # The address comes from the request body: only mail configured recipients
+            if self.allowed(recipient):
+                recipients.add(recipient)
+            else:
+                with self._lock:
+                    self.stats['recipients_refused'] += 1
+        if not recipients or not detections:
+            return False
+
+        now = time.time()
+        with self._lock:
+            self.stats['submitted'] += 1
+            for class_name, confidence in detections:
+                key = (camera_id, class_name)
+                incident = self._incidents.get(key)
+                if incident is None:
+                    incident = Incident(camera_id, class_name, now)
+                    self._incidents[key] = incident
+                    self.stats['incidents'] += 1
+                new_recipients = recipients - incident.recipients
+                incident.add(confidence, snapshot, recipients, now)
+                # Leading edge: the first detection goes out now, follow-ups when the window closes
+                for new_recipient in new_recipients:
+                    self._enqueue(new_recipient, incident)
+        self._wakeup.set()
+        return True
+
+    def _enqueue(self, recipient, incident):
+        """Queue an incident for a recipient (call with the lock held)"""
+        pending = self._pending.setdefault(recipient, [])
+        if incident in pending:
+            return
+        pending.append(incident)
+        # Bound the backlog (incidents hold snapshots) while a recipient waits
+        excess = len(pending) - MAX_PENDING
+        if excess > 0:
+            del pending[:excess]
+            self.stats['incidents_dropped'] += excess
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(0.5)
+            self._wakeup.clear()
+            try:
+                for recipient, incidents, attempt in self._collect_due(time.time()):
+                    self._deliver(recipient, incidents, attempt)
+            except Exception as e:
+                logger.error(f"Alert dispatcher error: {e}")
+
+    def _collect_due(self, now):
+        """Close expired incidents and return the mails that may go out now"""
+        due = []
+        with self._lock:
+            # Closed incidents with detections nobody has been told about yet go out as a summary
+            for key, incident in list(self._incidents.items()):
+                if now - incident.first_seen >= self.coalesce_window:
+                    del self._incidents[key]
+                    for recipient in incident.recipients:
+                        if incident.count > incident.mailed.get(recipient, 0):
+                            self._enqueue(recipient, incident)
+
+            # One mail per recipient with everything pending, respecting the per-recipient interval
+            for recipient, incidents in list(self._pending.items()):
+                if now < self._next_allowed.get(recipient, 0):
+                    continue
+                del self._pending[recipient]
+                self._next_allowed[recipient] = now + self.recipient_interval
+                for incident in incidents:
+                    incident.mailed[recipient] = incident.count
+                due.append((recipient, incidents, 1))
+
+            # Failed mails whose backoff has elapsed
+            retries = [r for r in self._retries if r[0] <= now]
+            self._retries = [r for r in self._retries if r[0] > now]
+            due.extend((recipient, batch, attempt) for _, attempt, recipient, batch in retries)
+        return due
+
+    def _deliver(self, recipient, incidents, attempt):
+        try:
+            self._send(recipient, incidents)
+            with self._lock:
+                self.stats['sent'] += 1
+            logger.info(f"📧 Alert sent to {recipient} ({len(incidents)} incidents)")
+        except Exception as e:
+            with self._lock:
+                self.stats['failed'] += 1
+                if attempt >= MAX_ATTEMPTS:
+                    self.stats['dropped'] += 1
+                    logger.error(f"❌ Giving up on alert to {recipient} after {attempt} attempts: {e}")
+                    return
+                delay = RETRY_BASE_DELAY * (2 ** (attempt - 1))
+                self._retries.append((time.time() + delay, attempt + 1, recipient, incidents))
+            logger.warning(f"⚠️  Alert to {recipient} failed (attempt {attempt}), retrying in {delay:.0f}s: {e}")
+
+    def _send(self, recipient, incidents):
+        message = EmailMessage()
+        cameras = sorted({incident.camera_id for incident in incidents})
+        message['Subject'] = f"🚨 Weapon detection alert: {len(incidents)} incident(s) on {', '.join(cameras)}"
+        message['From'] = self.sender
+        message['To'] = recipient
+
+        lines = ['Weapon detections reported by the CCTV detection server:', '']
+        for incident in incidents:
+            first = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(incident.first_seen))
+            last = time.strftime('%H:%M:%S', time.localtime(incident.last_seen))
+            lines.append(f"- {incident.class_name} on camera {incident.camera_id}: "
+                         f"{incident.count} detections, max confidence {incident.max_confidence:.0%}, "
+                         f"{first} - {last}")
+        message.set_content('\n'.join(lines))
+
+        # One snapshot per camera (its most confident incident) keeps large batches mailable
+        best = {}
+        for incident in incidents:
+            if incident.snapshot is not None:
+                current = best.get(incident.camera_id)
+                if current is None or incident.max_confidence > current.max_confidence:
+                    best[incident.camera_id] = incident
+        for camera_id, incident in sorted(best.items()):
+            message.add_attachment(incident.snapshot, maintype='image', subtype='png',
+                                   filename=f"{camera_id}-{incident.class_name}.png")
+
+        with smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=10) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.smtp_user:
+                smtp.login(self.smtp_user, self.smtp_password)
+            smtp.send_message(message)
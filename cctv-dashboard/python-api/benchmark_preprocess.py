@@ -0,0 +1,141 @@
+"""
+Preprocessing benchmark: legacy full-resolution decode vs the fast path
+
+Usage:
+    python benchmark_preprocess.py                 # synthetic 2560x1440 JPEG
+    python benchmark_preprocess.py frame.jpg -n 50
+
+Memory is reported two ways: peak RSS growth of a fresh process running only
+that path (includes PIL's C-level decode buffers), and peak tracemalloc
+allocation, which only sees NumPy/Python objects.
+"""
+import argparse
+import io
+import multiprocessing
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from preprocess import MODEL_SIZE, PAD_VALUE, BufferPool, letterbox_into
+
+
+def synthetic_frame(width=2560, height=1440):
+    """Build a camera-sized JPEG with some texture so it compresses realistically"""
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    noise = np.random.default_rng(0).integers(0, 40, (height, width), dtype=np.uint8)
+    gray = ((x + y) / 2).astype(np.uint8) + noise
+    frame = np.stack([gray, np.roll(gray, 7, axis=1), np.roll(gray, 13, axis=0)], axis=-1)
+    buffer = io.BytesIO()
+    Image.fromarray(frame).save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def legacy_preprocess(image_bytes):
+    """What the server used to do: full decode, RGB convert, then letterbox a new array"""
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    source = np.asarray(image)
+
+    height, width = source.shape[:2]
+    ratio = min(MODEL_SIZE / width, MODEL_SIZE / height)
+    content_w, content_h = round(width * ratio), round(height * ratio)
+    resized = np.asarray(image.resize((content_w, content_h), Image.BILINEAR))
+
+    padded = np.full((MODEL_SIZE, MODEL_SIZE, 3), PAD_VALUE, dtype=np.uint8)
+    pad_x, pad_y = (MODEL_SIZE - content_w) // 2, (MODEL_SIZE - content_h) // 2
+    padded[pad_y:pad_y + content_h, pad_x:pad_x + content_w] = resized[:, :, ::-1]
+    return padded
+
+
+def preprocessor(name, image_bytes):
+    """The ``legacy`` or ``fast`` path as a no-argument function"""
+    if name == 'legacy':
+        return lambda: legacy_preprocess(image_bytes)
+    pool = BufferPool(1)
+
+    def fast():
+        with pool.acquire() as buffer:
+            letterbox_into(image_bytes, buffer)
+    return fast
+
+
+def _max_rss():
+    """Peak resident set size of this process in bytes"""
+    # Linux keeps ru_maxrss across exec (a spawned child would report the parent's
+    # peak), so prefer the per-address-space high-water mark there
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kB on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _rss_growth(name, image_bytes, runs):
+    """Peak RSS growth (bytes) while running one path; runs in a fresh process"""
+    func = preprocessor(name, image_bytes)
+    baseline = _max_rss()
+    for _ in range(runs):
+        func()
+    return _max_rss() - baseline
+
+
+def peak_rss_growth(name, image_bytes, runs):
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(_rss_growth, name, image_bytes, runs).result()
+
+
+def measure(name, image_bytes, runs):
+    """Report mean wall time, peak RSS growth and peak traced (NumPy/Python) allocation"""
+    func = preprocessor(name, image_bytes)
+    func()  # warm up
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(runs):
+        func()
+    elapsed = (time.perf_counter() - start) / runs
+    _, traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss = peak_rss_growth(name, image_bytes, runs)
+    print(f"{name:<8} {elapsed * 1000:8.2f} ms/frame   peak RSS +{rss / 1e6:7.2f} MB   "
+          f"peak traced (NumPy/Python only) {traced / 1e6:7.2f} MB")
+    return elapsed, rss, traced
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('image', nargs='?', help='JPEG/PNG frame to use (default: synthetic)')
+    parser.add_argument('-n', '--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, 'rb') as f:
+            image_bytes = f.read()
+    else:
+        image_bytes = synthetic_frame()
+
+    size = Image.open(io.BytesIO(image_bytes)).size
+    print(f"📷 Frame {size[0]}x{size[1]}, {len(image_bytes) / 1e3:.0f} kB, {args.runs} runs")
+
+    legacy_time, legacy_rss, legacy_traced = measure('legacy', image_bytes, args.runs)
+    fast_time, fast_rss, fast_traced = measure('fast', image_bytes, args.runs)
+
+    print(f"⚡ Speed-up {legacy_time / fast_time:.1f}x, "
+          f"peak RSS growth {legacy_rss / 1e6:.1f} MB -> {fast_rss / 1e6:.1f} MB, "
+          f"traced NumPy/Python peak {legacy_traced / max(fast_traced, 1):.1f}x lower")
+
+
+if __name__ == '__main__':
+    main()
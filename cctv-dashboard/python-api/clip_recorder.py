@@ -0,0 +1,319 @@
+"""
+Per-camera pre-event ring buffers and incident clip export.
+
+Every frame the server receives is appended, still compressed, to a
+fixed-size ring for its camera (anonymous memory, or a memory-mapped file
+under RING_DIR). When a detection fires, a clip covering PRE_SECONDS before
+and POST_SECONDS after it is exported once that time has passed: a single
+scheduler thread waits for clips to end and hands them to a small export
+pool, so the inference path only pays for a memcpy into the ring.
+
+Clips are ZIP archives of the original frames (stored, not recompressed),
+named ``<frame number>_<capture time ms>.<jpg|png>``. Old clip files are
+removed by age and count after every export. Camera ids come from clients,
+so the number of rings is capped and idle rings are released.
+"""
+import heapq
+import itertools
+import logging
+import mmap
+import os
+import re
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+PRE_SECONDS = 10.0                # history kept before a detection
+POST_SECONDS = 5.0                # recording continues this long after the last detection
+MAX_CLIP_SECONDS = 120.0          # cap for clips extended by a long incident
+RING_BYTES = 16 * 1024 * 1024     # per-camera ring size
+RETENTION_SECONDS = 24 * 3600
+MAX_CLIPS = 200
+MAX_RINGS = 64                    # cameras with a ring at the same time
+RING_IDLE_SECONDS = 600.0         # rings without new frames for this long are released
+
+
+def _safe_name(value):
+    return re.sub(r'[^A-Za-z0-9_-]', '_', value)[:64]
+
+
+def _clip_name(clip_id):
+    """File name of a clip; the same for ids we generate and ids from URLs"""
+    return re.sub(r'[^A-Za-z0-9_-]', '_', clip_id) + '.zip'
+
+
+def _extension(frame):
+    return 'png' if frame[:8] == b'\x89PNG\r\n\x1a\n' else 'jpg'
+
+
+class FrameRing:
+    """Fixed-memory ring of compressed frames for one camera"""
+
+    def __init__(self, capacity, path=None):
+        self.capacity = capacity
+        if path:
+            # File-backed so the history survives memory pressure and can be inspected
+            with open(path, 'a+b') as f:
+                f.truncate(capacity)
+                self._buffer = mmap.mmap(f.fileno(), capacity)
+        else:
+            self._buffer = mmap.mmap(-1, capacity)
+        self.path = path
+        self._index = deque()   # (timestamp, offset, length), oldest first
+        self._head = 0
+        self._lock = threading.Lock()
+        self.last_append = time.time()
+        self.closed = False
+
+    def append(self, timestamp, frame):
+        """Store a frame; False if the ring has been closed"""
+        size = len(frame)
+        if size > self.capacity:
+            return True
+        with self._lock:
+            if self.closed:
+                return False
+            self.last_append = time.time()
+            if self._head + size > self.capacity:
+                # Wrap: frames left in the unused tail are the oldest ones
+                while self._index and self._index[0][1] >= self._head:
+                    self._index.popleft()
+                self._head = 0
+            # Evict frames from the previous lap that the new frame overwrites
+            end = self._head + size
+            while self._index and self._head <= self._index[0][1] < end:
+                self._index.popleft()
+            self._buffer[self._head:end] = frame
+            self._index.append((timestamp, self._head, size))
+            self._head = end
+        return True
+
+    def frames(self, start, end):
+        """Copies of the frames captured between ``start`` and ``end``"""
+        with self._lock:
+            if self.closed:
+                return []
+            return [(timestamp, self._buffer[offset:offset + size])
+                    for timestamp, offset, size in self._index
+                    if start <= timestamp <= end]
+
+    def close(self):
+        """Release the memory (and the backing file, if any)"""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self._index.clear()
+            self._buffer.close()
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class Clip:
+    def __init__(self, clip_id, camera_id, ring, start, end):
+        self.clip_id = clip_id
+        self.camera_id = camera_id
+        self.ring = ring
+        self.start = start
+        self.end = end
+        self.status = 'recording'
+        self.frames = 0
+
+    def info(self, url_prefix):
+        return {
+            'id': self.clip_id,
+            'url': f"{url_prefix}/{self.clip_id}",
+            'status': self.status,
+            'start': self.start,
+            'end': self.end,
+        }
+
+
+class ClipRecorder:
+    """Keeps the per-camera rings and exports clips around detections"""
+
+    def __init__(self, clip_dir, ring_dir=None, ring_bytes=RING_BYTES, pre_seconds=PRE_SECONDS,
+                 post_seconds=POST_SECONDS, retention_seconds=RETENTION_SECONDS, max_clips=MAX_CLIPS,
+                 max_rings=MAX_RINGS, ring_idle_seconds=RING_IDLE_SECONDS):
+        self.clip_dir = clip_dir
+        self.ring_dir = ring_dir
+        self.ring_bytes = ring_bytes
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.retention_seconds = retention_seconds
+        self.max_clips = max_clips
+        self.max_rings = max_rings
+        self.ring_idle_seconds = ring_idle_seconds
+
+        self._lock = threading.Lock()
+        self._rings = {}
+        self._recording = {}     # camera_id -> Clip still collecting frames
+        self._clips = {}         # clip_id -> Clip
+        self.stats = {'rings_released': 0, 'frames_refused': 0}
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='clip-export')
+        self._due = threading.Condition(self._lock)
+        self._schedule = []      # heap of (end, seq, Clip) waiting for their post-event frames
+        self._seq = itertools.count()
+        self._scheduler = None
+
+        os.makedirs(clip_dir, exist_ok=True)
+        if ring_dir:
+            os.makedirs(ring_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, instance='default'):
+        """Build a recorder from CLIP_DIR, RING_DIR, CLIP_PRE_SECONDS, CLIP_POST_SECONDS, CLIP_RETENTION_HOURS.
+
+        ``instance`` (the server port) keeps servers on one box apart: clips
+        default to ``clips/<instance>`` and ring files go to ``RING_DIR/<instance>``.
+        """
+        ring_dir = os.environ.get('RING_DIR')
+        return cls(
+            clip_dir=os.environ.get('CLIP_DIR') or os.path.join('clips', instance),
+            ring_dir=os.path.join(ring_dir, instance) if ring_dir else None,
+            pre_seconds=float(os.environ.get('CLIP_PRE_SECONDS', PRE_SECONDS)),
+            post_seconds=float(os.environ.get('CLIP_POST_SECONDS', POST_SECONDS)),
+            retention_seconds=float(os.environ.get('CLIP_RETENTION_HOURS', RETENTION_SECONDS / 3600)) * 3600,
+        )
+
+    def record(self, camera_id, frame, timestamp=None):
+        """Append a compressed frame to the camera's ring"""
+        timestamp = time.time() if timestamp is None else timestamp
+        for _ in range(2):
+            ring = self._ring_for(camera_id)
+            # A ring released by another thread in the meantime is closed: retry with a new one
+            if ring is None or ring.append(timestamp, frame):
+                return
+
+    def _ring_for(self, camera_id):
+        ring = self._rings.get(camera_id)
+        if ring is None:
+            released = []
+            with self._lock:
+                ring = self._rings.get(camera_id)
+                if ring is None:
+                    released = self._release_rings()
+                    if len(self._rings) < self.max_rings:
+                        path = None
+                        if self.ring_dir:
+                            path = os.path.join(self.ring_dir, f"{_safe_name(camera_id)}.ring")
+                        ring = FrameRing(self.ring_bytes, path)
+                        self._rings[camera_id] = ring
+                    else:
+                        self.stats['frames_refused'] += 1
+            for old in released:
+                old.close()
+        return ring
+
+    def _release_rings(self):
+        """Drop idle rings, and the least recently used one when full (call with the lock held)"""
+        busy = {clip.camera_id for clip in self._clips.values() if clip.status in ('recording', 'exporting')}
+        idle = sorted((ring.last_append, camera_id) for camera_id, ring in self._rings.items()
+                      if camera_id not in busy)
+        cutoff = time.time() - self.ring_idle_seconds
+        released = [camera_id for last_append, camera_id in idle if last_append < cutoff]
+        if len(self._rings) - len(released) >= self.max_rings:
+            released += [camera_id for _, camera_id in idle if camera_id not in released][:1]
+        self.stats['rings_released'] += len(released)
+        return [self._rings.pop(camera_id) for camera_id in released]
+
+    def trigger(self, camera_id, timestamp=None):
+        """Start (or extend) a clip around a detection; returns the clip info (None without a ring)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            clip = self._recording.get(camera_id)
+            if clip is not None:
+                # Same incident: keep recording a little longer
+                clip.end = min(timestamp + self.post_seconds, clip.start + MAX_CLIP_SECONDS)
+                return clip.info('/api/clips')
+
+            ring = self._rings.get(camera_id)
+            if ring is None:
+                return None
+            clip_id = f"{_safe_name(camera_id)}-{int(timestamp * 1000)}"
+            clip = Clip(clip_id, camera_id, ring, timestamp - self.pre_seconds, timestamp + self.post_seconds)
+            self._recording[camera_id] = clip
+            self._clips[clip_id] = clip
+            heapq.heappush(self._schedule, (clip.end, next(self._seq), clip))
+            if self._scheduler is None:
+                self._scheduler = threading.Thread(target=self._run_schedule, name='clip-scheduler',
+                                                   daemon=True)
+                self._scheduler.start()
+            self._due.notify()
+        return clip.info('/api/clips')
+
+    def get(self, clip_id):
+        """(status, path) for a clip id; status is None for unknown clips"""
+        with self._lock:
+            clip = self._clips.get(clip_id)
+        path = os.path.join(self.clip_dir, _clip_name(clip_id))
+        if clip is not None:
+            return clip.status, path
+        # Clips exported before a restart are only known from disk
+        return ('ready', path) if os.path.exists(path) else (None, None)
+
+    def _run_schedule(self):
+        """Hand clips to the export pool once their post-event window has passed"""
+        while True:
+            with self._due:
+                while not self._schedule or self._schedule[0][0] > time.time():
+                    timeout = self._schedule[0][0] - time.time() if self._schedule else None
+                    self._due.wait(timeout)
+                _, _, clip = heapq.heappop(self._schedule)
+                if clip.end > time.time():
+                    # trigger() extended the clip since it was scheduled
+                    heapq.heappush(self._schedule, (clip.end, next(self._seq), clip))
+                    continue
+                if self._recording.get(clip.camera_id) is clip:
+                    del self._recording[clip.camera_id]
+                clip.status = 'exporting'
+            self._executor.submit(self._export, clip)
+
+    def _export(self, clip):
+        try:
+            frames = clip.ring.frames(clip.start, clip.end)
+            path = os.path.join(self.clip_dir, _clip_name(clip.clip_id))
+            tmp_path = path + '.tmp'
+            with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_STORED) as archive:
+                for number, (timestamp, frame) in enumerate(frames):
+                    archive.writestr(f"{number:05d}_{int(timestamp * 1000)}.{_extension(frame)}", frame)
+            os.replace(tmp_path, path)
+
+            clip.frames = len(frames)
+            clip.status = 'ready'
+            logger.info(f"🎬 Exported clip {clip.clip_id} ({len(frames)} frames)")
+        except Exception as e:
+            clip.status = 'failed'
+            logger.error(f"❌ Clip export failed for {clip.clip_id}: {e}")
+        finally:
+            clip.ring = None
+            self._apply_retention()
+
+    def _apply_retention(self):
+        """Delete clip files that are too old or over the count limit (including ones from earlier runs)"""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.clip_dir):
+            if name.endswith('.zip'):
+                path = os.path.join(self.clip_dir, name)
+                entries.append((os.path.getmtime(path), path))
+        entries.sort()
+
+        expired = [path for mtime, path in entries if now - mtime > self.retention_seconds]
+        kept = [path for mtime, path in entries if now - mtime <= self.retention_seconds]
+        expired += kept[:max(0, len(kept) - self.max_clips)]
+
+        for path in expired:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            with self._lock:
+                self._clips.pop(os.path.basename(path)[:-len('.zip')], None)
@@ -0,0 +1,327 @@
+"""
+Inference coordinator for several detection server instances.
+
+Cameras are assigned to nodes with a consistent hash ring, so per-camera
+state (admission counters, frame rings, clips, alert coalescing) stays on one
+node. Nodes are health-checked through /health; when a camera's node is
+down its frames go to the next node on the ring and move back once it
+recovers.
+
+Usage:
+    python coordinator.py --port 5000 --nodes http://localhost:5001,http://localhost:5002
+
+Try it locally with a few detection servers on different ports:
+    python optimized_detect_server.py --port 5001
+    python optimized_detect_server.py --port 5002
+    python coordinator.py --nodes http://localhost:5001,http://localhost:5002
+
+Each server keeps its clips, snapshots and ring files in per-port folders
+(clips/<port>, snapshots/<port>). Snapshot and clip links in responses are
+root-relative; the coordinator serves /snapshots and /api/clips by fetching
+them from whichever node has them.
+
+or, without models, with simulated nodes (see test_server.py --help):
+    python test_server.py --port 5001 --concurrency 2 --latency-ms 150
+"""
+import argparse
+import bisect
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import requests
+from flask import Flask, Response, request, jsonify
+from flask_cors import CORS
+
+from admission import parse_camera_id
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = Flask(__name__)
+CORS(app)
+
+VIRTUAL_NODES = 100        # ring points per node, smooths the camera distribution
+HEALTH_INTERVAL = 5.0      # seconds between health checks
+HEALTH_TIMEOUT = 2.0
+REQUEST_TIMEOUT = 30.0
+FORWARDED_HEADERS = ('Content-Type', 'Accept', 'X-Camera-Id', 'X-Capture-Timestamp', 'X-Deadline',
+                     'X-Max-Age-Ms')
+SNAPSHOT_HEADERS = ('Range', 'If-None-Match', 'If-Modified-Since', 'If-Range')
+RETURNED_HEADERS = ('Content-Type', 'Retry-After', 'Cache-Control', 'ETag', 'X-Next-Sample-Ms',
+                    'X-Alert-Dispatch', 'X-Clip', 'Content-Range', 'Accept-Ranges', 'Last-Modified')
+
+
+def _hash(value):
+    return int(hashlib.md5(value.encode()).hexdigest(), 16)
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to an ordered list of nodes"""
+
+    def __init__(self, nodes, virtual_nodes=VIRTUAL_NODES):
+        self._points = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(virtual_nodes))
+        self._keys = [point for point, _ in self._points]
+        self._node_count = len(set(nodes))
+
+    def nodes_for(self, key):
+        """All nodes in ring order starting at ``key``'s owner (owner first, then failovers)"""
+        if not self._points:
+            return []
+        start = bisect.bisect(self._keys, _hash(key)) % len(self._points)
+        ordered = []
+        for offset in range(len(self._points)):
+            node = self._points[(start + offset) % len(self._points)][1]
+            if node not in ordered:
+                ordered.append(node)
+                if len(ordered) == self._node_count:
+                    break
+        return ordered
+
+
+class Node:
+    """Health and capacity of one detection server"""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.healthy = False
+        self.last_check = None
+        self.last_error = None
+        self.health = {}
+
+    def capacity(self):
+        admission = self.health.get('admission') or {}
+        return {
+            'max_concurrent': admission.get('max_concurrent', 0),
+            'max_queue': admission.get('max_queue', 0),
+            'active': admission.get('active', 0),
+            'waiting': admission.get('waiting', 0),
+        }
+
+    def info(self):
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'last_check': self.last_check,
+            'last_error': self.last_error,
+            'capacity': self.capacity(),
+        }
+
+
+class Coordinator:
+    """Routes requests to nodes and keeps their health up to date"""
+
+    def __init__(self, urls):
+        self.nodes = {url.rstrip('/'): Node(url) for url in urls}
+        self.ring = HashRing(list(self.nodes))
+        self._session = requests.Session()
+
+    def check(self, node):
+        try:
+            response = self._session.get(f"{node.url}/health", timeout=HEALTH_TIMEOUT)
+            response.raise_for_status()
+            node.health = response.json()
+            # A node answers /health even without AI packages or models; only route to working ones
+            models_loaded = node.health.get('models_loaded') or {}
+            if node.health.get('status') != 'healthy' or not models_loaded or not all(models_loaded.values()):
+                raise RuntimeError(f"not ready: status={node.health.get('status')}, models={models_loaded}")
+            node.healthy = True
+            node.last_error = None
+        except Exception as e:
+            if node.healthy:
+                logger.warning(f"⚠️  Node {node.url} is down: {e}")
+            node.healthy = False
+            node.last_error = str(e)
+        node.last_check = time.time()
+
+    def check_all(self):
+        for node in self.nodes.values():
+            was_healthy = node.healthy
+            self.check(node)
+            if node.healthy and not was_healthy:
+                logger.info(f"✅ Node {node.url} is up")
+
+    def start_health_checks(self):
+        def loop():
+            while True:
+                self.check_all()
+                time.sleep(HEALTH_INTERVAL)
+        threading.Thread(target=loop, name='health-checks', daemon=True).start()
+
+    def route(self, camera_id):
+        """Healthy nodes for a camera, affinity owner first"""
+        return [self.nodes[url] for url in self.ring.nodes_for(camera_id) if self.nodes[url].healthy]
+
+    def forward(self, node, method, path, headers=None, **kwargs):
+        return self._session.request(method, f"{node.url}{path}", timeout=REQUEST_TIMEOUT,
+                                     headers=headers, **kwargs)
+
+    def status(self):
+        nodes = [node.info() for node in self.nodes.values()]
+        healthy = [node for node in nodes if node['healthy']]
+        totals = {
+            key: sum(node['capacity'][key] for node in healthy)
+            for key in ('max_concurrent', 'max_queue', 'active', 'waiting')
+        }
+        return {
+            'status': 'healthy' if healthy else 'unavailable',
+            'mode': 'coordinator',
+            'nodes_total': len(nodes),
+            'nodes_healthy': len(healthy),
+            'capacity': totals,
+            'nodes': nodes,
+        }
+
+
+coordinator = None
+
+
+def _is_node_failure(response):
+    """Answers meaning the node can't serve any frame (no AI packages, models not loaded).
+
+    Overload 503s carry Retry-After and per-request errors ('Detection failed: ...')
+    belong to the frame, so both go back to the client.
+    """
+    if response.status_code == 503:
+        return 'Retry-After' not in response.headers
+    if response.status_code == 500:
+        try:
+            error = (response.json() or {}).get('error') or ''
+        except ValueError:
+            return False
+        return error.startswith('Models not loaded')
+    return False
+
+
+def _relay(response, node):
+    """Turn a node's response into a Flask response"""
+    headers = {name: response.headers[name] for name in RETURNED_HEADERS if name in response.headers}
+    headers['X-Served-By'] = node.url
+    return Response(response.content, status=response.status_code, headers=headers)
+
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Aggregate health and capacity of all nodes"""
+    status = coordinator.status()
+    return jsonify(status), 200 if status['nodes_healthy'] else 503
+
+
+@app.route('/api/detect-weapons', methods=['POST'])
+def detect_weapons():
+    """Forward a frame to the camera's node, failing over along the ring"""
+    body = request.get_data()
+    # Prefer the header so we don't have to parse a JSON body full of base64
+    data = None if 'X-Camera-Id' in request.headers else request.get_json(silent=True)
+    camera_id = parse_camera_id(request.headers, data)
+    headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+
+    failed = None
+    for node in coordinator.route(camera_id):
+        try:
+            response = coordinator.forward(node, 'POST', '/api/detect-weapons', data=body, headers=headers)
+        except requests.RequestException as e:
+            # Node died between health checks: take it out and try the next one
+            logger.warning(f"⚠️  {node.url} failed for camera {camera_id}, re-routing: {e}")
+            node.healthy = False
+            node.last_error = str(e)
+            continue
+        if _is_node_failure(response):
+            # Broken node: take it out until its next health check and try the next one
+            logger.warning(f"⚠️  {node.url} answered {response.status_code} for camera {camera_id}, re-routing")
+            node.healthy = False
+            node.last_error = f"HTTP {response.status_code}"
+            failed = (response, node)
+            continue
+        # Everything else, overload answers included, goes back so the camera keeps its node
+        return _relay(response, node)
+
+    if failed is not None:
+        return _relay(*failed)
+    return jsonify({
+        'success': False,
+        'error': 'No healthy detection nodes available',
+        'fallback': True
+    }), 503
+
+
+@app.route('/api/models/info', methods=['GET'])
+def get_model_info():
+    """Model information from any healthy node"""
+    for node in coordinator.route('models'):
+        try:
+            return _relay(coordinator.forward(node, 'GET', '/api/models/info'), node)
+        except requests.RequestException:
+            continue
+    return jsonify({'error': 'No healthy detection nodes available'}), 503
+
+
+@app.route('/api/clips/<clip_id>', methods=['GET'])
+def get_clip(clip_id):
+    """Clips live on the node that recorded them; ask each healthy node"""
+    for node in coordinator.route(clip_id):
+        try:
+            response = coordinator.forward(node, 'GET', f'/api/clips/{clip_id}')
+        except requests.RequestException:
+            continue
+        if response.status_code != 404:
+            return _relay(response, node)
+    return jsonify({'success': False, 'error': 'Clip not found'}), 404
+
+
+@app.route('/snapshots/<name>', methods=['GET'])
+def get_snapshot(name):
+    """Snapshots live on the node that stored them; ask each healthy node"""
+    headers = {h: request.headers[h] for h in SNAPSHOT_HEADERS if h in request.headers}
+    for node in coordinator.route(name):
+        try:
+            response = coordinator.forward(node, 'GET', f'/snapshots/{name}', headers=headers)
+        except requests.RequestException:
+            continue
+        if response.status_code != 404:
+            return _relay(response, node)
+    return jsonify({'success': False, 'error': 'Snapshot not found'}), 404
+
+
+@app.route('/api/cluster/status', methods=['GET'])
+def cluster_status():
+    """Per-node health plus camera placement for the given ?camera= ids"""
+    status = coordinator.status()
+    cameras = [c for c in request.args.get('camera', '').split(',') if c]
+    status['placement'] = {
+        camera: [node.url for node in coordinator.route(camera)][:1] or None
+        for camera in cameras
+    }
+    return jsonify(status)
+
+
+def main():
+    global coordinator
+
+    parser = argparse.ArgumentParser(description='Detection server coordinator')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--nodes', default=os.environ.get('COORDINATOR_NODES', ''),
+                        help='comma-separated detection server URLs')
+    args = parser.parse_args()
+
+    urls = [url.strip() for url in args.nodes.split(',') if url.strip()]
+    if not urls:
+        parser.error('at least one node is required (--nodes or COORDINATOR_NODES)')
+
+    coordinator = Coordinator(urls)
+    coordinator.check_all()
+    coordinator.start_health_checks()
+
+    print("🚀 Starting Detection Coordinator...")
+    print(f"📍 Coordinator will run on: http://localhost:{args.port}")
+    for node in coordinator.nodes.values():
+        print(f"   {'✅' if node.healthy else '❌'} {node.url}")
+
+    app.run(host='0.0.0.0', port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""
+Hot-reloadable model registry.
+
+Each model name (``best``, ``last``) has an active and a previous slot. New
+weights are loaded and warmed up on a background thread, then swapped in
+atomically; requests already running keep their handle and the replaced
+model is only freed once they have all finished. Rollback swaps the active
+and previous slots back.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WATCH_INTERVAL = 5.0   # seconds between weight file checks
+
+
+def file_version(path):
+    """Short content hash used as the model version"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class ModelHandle:
+    """A loaded model plus the bookkeeping needed to free it safely"""
+
+    def __init__(self, name, path, model, version):
+        self.name = name
+        self.path = path
+        self.model = model
+        self.version = version
+        self.loaded_at = time.time()
+        self.refs = 0
+        self.retired = False
+
+    def info(self):
+        return {
+            'version': self.version,
+            'path': self.path,
+            'loaded_at': self.loaded_at,
+            'in_flight': self.refs,
+        }
+
+
+class ModelRegistry:
+    """Double-buffered model slots with atomic swap and rollback"""
+
+    def __init__(self, loader, warmup_size=640):
+        self._loader = loader
+        self._warmup_size = warmup_size
+        self._lock = threading.Lock()
+        self._active = {}
+        self._previous = {}
+        self._reloading = set()
+        self._watchers = {}
+
+    def is_loaded(self, name):
+        return name in self._active
+
+    def names(self, name):
+        """Class names of the active model (empty when not loaded)"""
+        handle = self._active.get(name)
+        return handle.model.names if handle else {}
+
+    def load(self, name, path):
+        """Load, warm up and activate weights synchronously"""
+        handle = self._build(name, path)
+        self._swap(name, handle)
+        return handle
+
+    def reload_async(self, name, path=None):
+        """Load new weights in the background and swap them in when ready.
+
+        Returns False if a reload of this model is already running.
+        """
+        with self._lock:
+            if name in self._reloading:
+                return False
+            if path is None:
+                current = self._active.get(name)
+                if current is None:
+                    raise KeyError(f'No model path known for {name}')
+                path = current.path
+            self._reloading.add(name)
+
+        def worker():
+            try:
+                current = self._active.get(name)
+                if current is not None and file_version(path) == current.version:
+                    logger.info(f"{name} model {current.version} is already active, nothing to reload")
+                    return
+                handle = self._build(name, path)
+                self._swap(name, handle)
+            except Exception as e:
+                logger.error(f"❌ Hot reload of {name} model failed, keeping current weights: {e}")
+            finally:
+                with self._lock:
+                    self._reloading.discard(name)
+
+        threading.Thread(target=worker, name=f'reload-{name}', daemon=True).start()
+        return True
+
+    def rollback(self, name):
+        """Swap the previous weights back in. Returns the now-active handle."""
+        with self._lock:
+            previous = self._previous.get(name)
+            if previous is None:
+                raise KeyError(f'No previous version of {name} to roll back to')
+            self._previous[name] = self._active[name]
+            self._active[name] = previous
+        logger.info(f"↩️  Rolled back {name} model to {previous.version}")
+        return previous
+
+    @contextmanager
+    def acquire(self, name):
+        """Pin the active handle for the duration of one request"""
+        with self._lock:
+            handle = self._active[name]
+            handle.refs += 1
+        try:
+            yield handle
+        finally:
+            with self._lock:
+                handle.refs -= 1
+                free = handle.retired and handle.refs == 0
+            if free:
+                self._free(handle)
+
+    def status(self):
+        with self._lock:
+            return {
+                name: {
+                    'active': handle.info(),
+                    'previous': self._previous[name].info() if name in self._previous else None,
+                    'reloading': name in self._reloading,
+                }
+                for name, handle in self._active.items()
+            }
+
+    def watch(self, name, path, interval=WATCH_INTERVAL):
+        """Reload ``name`` whenever the weight file at ``path`` changes"""
+        if name in self._watchers:
+            return
+
+        def watcher():
+            last_seen = _file_signature(path)
+            while True:
+                time.sleep(interval)
+                signature = _file_signature(path)
+                if signature is None or signature == last_seen:
+                    continue
+                # Wait one more interval so we don't load a half-copied file
+                time.sleep(interval)
+                if _file_signature(path) != signature:
+                    continue
+                last_seen = signature
+                logger.info(f"🔄 {path} changed, reloading {name} model")
+                self.reload_async(name, path)
+
+        thread = threading.Thread(target=watcher, name=f'watch-{name}', daemon=True)
+        self._watchers[name] = thread
+        thread.start()
+
+    def _build(self, name, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model not found: {path}")
+        version = file_version(path)
+        logger.info(f"Loading {name} model {version} from {path}...")
+        model = self._loader(path)
+        # Warm-up so the first real request doesn't pay for lazy initialisation
+        model(np.zeros((self._warmup_size, self._warmup_size, 3), dtype=np.uint8), verbose=False)
+        return ModelHandle(name, path, model, version)
+
+    def _swap(self, name, handle):
+        with self._lock:
+            old = self._active.get(name)
+            retired = self._previous.get(name)
+            self._active[name] = handle
+            if old is not None:
+                self._previous[name] = old
+            free = False
+            if retired is not None:
+                retired.retired = True
+                free = retired.refs == 0
+        if free:
+            self._free(retired)
+        logger.info(f"✅ {name} model {handle.version} is now active")
+
+    def _free(self, handle):
+        logger.info(f"🗑️  Freeing {handle.name} model {handle.version}")
+        handle.model = None
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime, stat.st_size)
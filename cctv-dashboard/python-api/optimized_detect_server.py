@@ -1,13 +1,26 @@
 import os
 import sys
+import argparse
 import base64
 import io
 import traceback
 import logging
+import numpy as np
 from PIL import Image
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 
+from admission import AdmissionController, AdmissionRejected, parse_camera_id, parse_deadline
+from preprocess import MODEL_SIZE, BufferPool, decode_base64, letterbox_into
+from alert_dispatcher import AlertDispatcher
+from admin_auth import require_admin
+from profiling import AllocationTracker, Profiler, ProfilerBusy, folded_text, pstats_dump, pstats_text
+from model_registry import ModelRegistry
+from response_format import encode, extra_headers, extract_arrays, negotiate
+from clip_recorder import ClipRecorder
+from snapshot_store import SnapshotStore
+from sampling import SampleTooEarly, SamplingScheduler, motion_thumbnail
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,6 +28,11 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
+parser = argparse.ArgumentParser(description='Weapon detection server')
+parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+# Resolved before the per-port clip/snapshot folders below are created; importers use $PORT
+PORT = parser.parse_args().port if __name__ == '__main__' else parser.get_default('port')
+
 # Try to import AI packages
 try:
     from ultralytics import YOLO
@@ -24,38 +42,52 @@ except ImportError as e:
     AI_AVAILABLE = False
     logger.error(f"❌ AI packages not available: {e}")
 
-# Global variables for models
-best_model = None
-last_model = None
+# Model weights, hot-reloadable (see /admin/models/*)
+MODEL_DIR = os.environ.get('MODEL_DIR', r'c:\Users\pdkir\OneDrive\Desktop\DRDO VIT\weaponDetection\cctv-dashboard\Model')
+MODEL_FILES = {'best': 'best.pt', 'last': 'last.pt'}
+models = ModelRegistry(YOLO if AI_AVAILABLE else None, MODEL_SIZE)
+
+# Bounded queue in front of inference
+admission = AdmissionController()
+
+# Per-camera next-sample intervals from activity and load (see SAMPLE_* env vars)
+sampling = SamplingScheduler.from_env()
+
+# Reduced-size decode into reusable letterbox buffers (one per inference slot)
+FAST_PREPROCESS = True
+input_buffers = BufferPool(admission.max_concurrent, MODEL_SIZE)
+
+# Detection alerts are coalesced and mailed from a background thread (see ALERT_* env vars)
+alerts = AlertDispatcher.from_env()
+
+# Per-camera pre-event frame rings and incident clips (see CLIP_* / RING_DIR env vars)
+clips = ClipRecorder.from_env(str(PORT))
+
+# Annotated snapshots, written once by content hash and served from /snapshots
+snapshots = SnapshotStore.from_env(str(PORT))
+# Snapshot and clip links are root-relative (the dashboard and the coordinator both proxy
+# /snapshots and /api/clips); set this to hand out absolute links on another origin instead
+SNAPSHOT_BASE_URL = os.environ.get('SNAPSHOT_BASE_URL')
+SNAPSHOT_MAX_AGE = 365 * 24 * 3600  # entries never change, so clients can cache them for good
+
+# On-demand profiling (idle unless an admin starts a session)
+profiler = Profiler()
+allocations = AllocationTracker()
 
 def load_models():
     """Load the trained YOLO models using ultralytics YOLO (not torch.hub)"""
-    global best_model, last_model
-    
     if not AI_AVAILABLE:
         logger.error("AI packages not available")
         return False
     
     try:
-        # Path to your models
-        model_dir = r'c:\Users\pdkir\OneDrive\Desktop\DRDO VIT\weaponDetection\cctv-dashboard\Model'
-        best_model_path = os.path.join(model_dir, 'best.pt')
-        last_model_path = os.path.join(model_dir, 'last.pt')
-        
-        logger.info(f"Loading models from: {model_dir}")
+        logger.info(f"Loading models from: {MODEL_DIR}")
         
-        # Check if model files exist
-        if not os.path.exists(best_model_path):
-            raise FileNotFoundError(f"Best model not found: {best_model_path}")
-        if not os.path.exists(last_model_path):
-            raise FileNotFoundError(f"Last model not found: {last_model_path}")
-        
-        # Load models using ultralytics YOLO (modern approach)
-        logger.info("Loading best.pt model...")
-        best_model = YOLO(best_model_path)
-        
-        logger.info("Loading last.pt model...")
-        last_model = YOLO(last_model_path)
+        # Load, warm up and watch each weight file for hot reloads
+        for name, filename in MODEL_FILES.items():
+            path = os.path.join(MODEL_DIR, filename)
+            models.load(name, path)
+            models.watch(name, path)
         
         logger.info("✅ Models loaded successfully!")
         return True
@@ -88,21 +120,24 @@ def process_image(image_data):
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    global best_model, last_model
     return jsonify({
         'status': 'healthy' if AI_AVAILABLE else 'ai_unavailable',
         'ai_available': AI_AVAILABLE,
         'models_loaded': {
-            'best_model': best_model is not None,
-            'last_model': last_model is not None
-        }
+            'best_model': models.is_loaded('best'),
+            'last_model': models.is_loaded('last')
+        },
+        'admission': admission.stats(),
+        'alerts': dict(alerts.stats),
+        'clips': dict(clips.stats),
+        'snapshots': snapshots.usage(),
+        'sampling': sampling.stats()
     })
 
 @app.route('/api/detect-weapons', methods=['POST'])
+@profiler.profiled
 def detect_weapons():
     """Main weapon detection endpoint"""
-    global best_model, last_model
-    
     try:
         # Check if AI packages are available
         if not AI_AVAILABLE:
@@ -113,88 +148,139 @@ def detect_weapons():
             }), 503
         
         # Check if models are loaded
-        if best_model is None or last_model is None:
+        if not models.is_loaded('best') or not models.is_loaded('last'):
             return jsonify({
                 'success': False,
                 'error': 'Models not loaded. Please restart the server.',
                 'fallback': True
             }), 500
         
-        data = request.json
+        data = request.get_json(silent=True)
         if not data or 'image' not in data:
             return jsonify({
                 'success': False,
                 'error': 'No image data provided'
             }), 400
         
+        # Admission: bounded queue, drop stale frames before decoding them
+        camera_id = parse_camera_id(request.headers, data)
+        deadline = parse_deadline(request.headers, data)
+        sampled = camera_id != 'unknown'
+        try:
+            # Frames sent before the camera's recommended interval are refused up front
+            if sampled:
+                sampling.check(camera_id)
+        except AdmissionRejected as e:
+            return rejection_response(e, camera_id)
+        
+        try:
+            admission.acquire(camera_id, deadline)
+        except AdmissionRejected as e:
+            # The frame was never processed, so it must not delay the camera's next one
+            if sampled:
+                sampling.cancel(camera_id)
+            return rejection_response(e, camera_id)
+        
+        try:
+            admission.check_deadline(camera_id, deadline)
+            return run_detection(data, camera_id)
+        except AdmissionRejected as e:
+            if sampled:
+                sampling.cancel(camera_id)
+            return rejection_response(e, camera_id)
+        finally:
+            admission.release()
+        
+    except Exception as e:
+        logger.error(f"Error in weapon detection: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': f'Detection failed: {str(e)}',
+            'fallback': True
+        }), 500
+
+def rejection_response(rejection, camera_id='unknown'):
+    """Build a fast 429/503 response with Retry-After (and the camera's next sample time)"""
+    next_sample_ms = None
+    if camera_id != 'unknown':
+        next_sample_ms = sampling.next_sample_ms(camera_id)
+        if not isinstance(rejection, SampleTooEarly):
+            # Overloaded or stale: don't come back before Retry-After
+            next_sample_ms = max(next_sample_ms, rejection.retry_after * 1000)
+    response = jsonify({
+        'success': False,
+        'error': rejection.reason,
+        'retry_after': rejection.retry_after,
+        'next_sample_ms': next_sample_ms
+    })
+    response.status_code = rejection.status_code
+    response.headers['Retry-After'] = str(rejection.retry_after)
+    if next_sample_ms is not None:
+        response.headers['X-Next-Sample-Ms'] = str(next_sample_ms)
+    return response
+
+def run_detection(data, camera_id):
+    """Decode the frame, run the selected model and build the JSON response"""
+    try:
         image_data = data['image']
-        model_type = data.get('model', 'best')  # Default to best model
+        model_type = 'last' if data.get('model') == 'last' else 'best'  # Default to best model
         confidence_threshold = data.get('confidence', 0.3)
+        notify_email = data.get('notify_email')
+        response_format = negotiate(request.headers.get('Accept'))
+        include_image = bool(data.get('include_image', False))
+        inline_image = bool(data.get('inline_image', False))
         
         logger.info(f"Processing detection request with {model_type} model")
         
-        # Process image
-        image = process_image(image_data)
-        if image is None:
+        try:
+            image_bytes = decode_base64(image_data)
+        except Exception as e:
+            logger.error(f"Error processing image: {str(e)}")
             return jsonify({
                 'success': False,
                 'error': 'Failed to process image data'
             }), 400
         
-        # Select model
-        model = best_model if model_type == 'best' else last_model
-        
-        # Run inference using modern ultralytics YOLO
-        results = model(image, conf=confidence_threshold, verbose=False)
-        
-        # Process results
-        detections = []
-        annotated_image = None
-        
-        if len(results) > 0:
-            result = results[0]  # Get first result
+        # Pin the active model so a hot reload can't free it mid-request
+        with models.acquire(model_type) as handle:
+            model = handle.model
             
-            # Extract detections
-            if result.boxes is not None and len(result.boxes) > 0:
-                for box in result.boxes:
-                    confidence = float(box.conf.item())
-                    if confidence >= confidence_threshold:
-                        class_id = int(box.cls.item())
-                        class_name = model.names[class_id]
-                        bbox = box.xyxy[0].tolist()  # [x1, y1, x2, y2]
-                        
-                        detections.append({
-                            'class': class_name,
-                            'confidence': confidence,
-                            'bbox': bbox
-                        })
+            if not FAST_PREPROCESS:
+                image = process_image(image_data)
+                if image is None:
+                    return jsonify({
+                        'success': False,
+                        'error': 'Failed to process image data'
+                    }), 400
+                record_frame(camera_id, image_bytes)
+                results = model(image, conf=confidence_threshold, verbose=False)
+                return build_response(results, handle, model_type, confidence_threshold,
+                                      camera_id=camera_id, notify_email=notify_email,
+                                      response_format=response_format, include_image=include_image,
+                                      inline_image=inline_image)
             
-            # Create annotated image
-            try:
-                annotated_array = result.plot()
-                annotated_pil = Image.fromarray(annotated_array)
+            # The buffer is reused, so everything that reads the result stays inside the block
+            with input_buffers.acquire() as buffer:
+                try:
+                    transform = letterbox_into(image_bytes, buffer)
+                except Exception as e:
+                    logger.error(f"Error processing image: {str(e)}")
+                    return jsonify({
+                        'success': False,
+                        'error': 'Failed to process image data'
+                    }), 400
+                record_frame(camera_id, image_bytes)
                 
-                # Convert to base64
-                buffer = io.BytesIO()
-                annotated_pil.save(buffer, format='PNG')
-                annotated_b64 = base64.b64encode(buffer.getvalue()).decode()
-                annotated_image = f'data:image/png;base64,{annotated_b64}'
-            except Exception as e:
-                logger.warning(f"Failed to create annotated image: {e}")
-                annotated_image = None
-        
-        logger.info(f"Detection complete. Found {len(detections)} weapons")
-        
-        return jsonify({
-            'success': True,
-            'detections': detections,
-            'annotated_image': annotated_image,
-            'model_used': model_type,
-            'total_detections': len(detections)
-        })
+                results = model(buffer, conf=confidence_threshold, imgsz=MODEL_SIZE, verbose=False)
+                return build_response(results, handle, model_type, confidence_threshold, transform,
+                                      thumbnail=motion_thumbnail(buffer), camera_id=camera_id,
+                                      notify_email=notify_email,
+                                      response_format=response_format, include_image=include_image,
+                                      inline_image=inline_image)
         
     except Exception as e:
-        logger.error(f"Error in weapon detection: {str(e)}")
+        logger.error(f"Error running detection: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({
             'success': False,
@@ -202,30 +288,271 @@ def detect_weapons():
             'fallback': True
         }), 500
 
+def record_frame(camera_id, image_bytes):
+    """Keep a decoded frame, still compressed, in the camera's pre-event ring"""
+    if camera_id == 'unknown':
+        return
+    try:
+        clips.record(camera_id, image_bytes)
+    except Exception as e:
+        # Losing pre-event footage must never fail the detection itself
+        logger.warning(f"Failed to record frame for camera {camera_id}: {e}")
+
+def render_annotated(result, transform):
+    """Draw the detection boxes onto the frame and return it as an RGB array"""
+    if result is None:
+        return None
+    try:
+        annotated_array = result.plot()
+        if transform is not None:
+            # Drop the letterbox padding
+            annotated_array = transform.crop_content(annotated_array)
+        # Ultralytics plots in BGR
+        return np.ascontiguousarray(annotated_array[:, :, ::-1])
+    except Exception as e:
+        logger.warning(f"Failed to create annotated image: {e}")
+        return None
+
+def encode_image(array, image_format):
+    """Encode an RGB array as PNG/JPEG bytes"""
+    if array is None:
+        return None
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+def public_url(path):
+    """Link for a path on this server, as clients should request it"""
+    if SNAPSHOT_BASE_URL:
+        return SNAPSHOT_BASE_URL.rstrip('/') + path
+    return path
+
+def snapshot_urls(digest):
+    """Links to a stored snapshot and its thumbnail"""
+    return public_url(f"/snapshots/{digest}.jpg"), public_url(f"/snapshots/{digest}.thumb.jpg")
+
+def build_response(results, handle, model_type, confidence_threshold, transform=None, thumbnail=None,
+                   camera_id=None, notify_email=None, response_format=None, include_image=False,
+                   inline_image=False):
+    """Turn YOLO results into the detection response (boxes in source-image coordinates)"""
+    model = handle.model
+    result = results[0] if len(results) > 0 else None
+    
+    # Boxes, scores and class ids straight from the result tensors
+    boxes, scores, class_ids = extract_arrays(result, confidence_threshold, transform)
+    detected = [(model.names[int(class_id)], float(score)) for class_id, score in zip(class_ids, scores)]
+    
+    logger.info(f"Detection complete. Found {len(detected)} weapons")
+    
+    # Export a clip around the detection in the background
+    clip = None
+    if detected and camera_id not in (None, 'unknown'):
+        clip = clips.trigger(camera_id)
+        if clip is not None:
+            clip['url'] = public_url(clip['url'])
+    
+    # Only render the annotated frame when something will use it (binary formats store no snapshot)
+    alerting = bool(detected) and alerts.enabled(notify_email)
+    annotated = None
+    if include_image or alerting or (response_format is None and (detected or inline_image)):
+        annotated = render_annotated(result, transform)
+    
+    alert_snapshot = None
+    if alerting:
+        alert_snapshot = encode_image(annotated, 'PNG')
+    # Queue an alert; delivery happens on the dispatcher thread
+    alert_queued = alerts.submit(camera_id, detected, alert_snapshot, notify_email)
+    # 'server' only when the requested address will be mailed; 'refused' lets the client fall back
+    if detected and notify_email and not alerts.allowed(notify_email):
+        alert_dispatch = 'refused'
+    else:
+        alert_dispatch = 'server' if alert_queued else None
+    
+    # When this camera should send its next frame, from detections, motion and load
+    next_sample_ms = None
+    if camera_id not in (None, 'unknown'):
+        # This request still holds its slot; only the others count as load
+        next_sample_ms = sampling.observe(camera_id, detected, thumbnail, admission.load(exclude=1))
+    
+    if response_format is not None:
+        image = encode_image(annotated, 'JPEG') if include_image else None
+        extra = {'alert_dispatch': alert_dispatch, 'clip': clip,
+                 'next_sample_ms': next_sample_ms}
+        body, mimetype = encode(response_format, boxes, scores, class_ids, model_type, handle.version,
+                                image=image, extra=extra)
+        # The fixed binary layout has no room for extras, so they also travel as headers
+        return Response(body, mimetype=mimetype, headers=extra_headers(extra))
+    
+    # Snapshots go to the content-addressed store; the response only carries URLs
+    snapshot_url = thumbnail_url = None
+    if detected and annotated is not None:
+        snapshot_url, thumbnail_url = snapshot_urls(snapshots.put(annotated))
+    
+    # Legacy clients can still ask for the base64 PNG inline
+    annotated_image = None
+    if inline_image and annotated is not None:
+        annotated_image = f'data:image/png;base64,{base64.b64encode(encode_image(annotated, "PNG")).decode()}'
+    
+    detections = [
+        {'class': class_name, 'confidence': confidence, 'bbox': bbox}
+        for (class_name, confidence), bbox in zip(detected, boxes.tolist())
+    ]
+    
+    response = jsonify({
+        'success': True,
+        'detections': detections,
+        'snapshot_url': snapshot_url,
+        'thumbnail_url': thumbnail_url,
+        'annotated_image': annotated_image,
+        'model_used': model_type,
+        'model_version': handle.version,
+        'total_detections': len(detections),
+        'alert_dispatch': alert_dispatch,
+        'clip': clip,
+        'next_sample_ms': next_sample_ms
+    })
+    if next_sample_ms is not None:
+        response.headers['X-Next-Sample-Ms'] = str(next_sample_ms)
+    return response
+
+@app.route('/snapshots/<name>', methods=['GET'])
+def get_snapshot(name):
+    """Serve a stored snapshot with ETag, immutable caching and range support"""
+    path = snapshots.path(name)
+    if path is None:
+        return jsonify({'success': False, 'error': 'Snapshot not found'}), 404
+    response = send_file(os.path.abspath(path), mimetype='image/jpeg', conditional=True,
+                         etag=name, max_age=SNAPSHOT_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={SNAPSHOT_MAX_AGE}, immutable'
+    return response
+
 @app.route('/api/models/info', methods=['GET'])
 def get_model_info():
     """Get information about loaded models"""
-    global best_model, last_model
-    
     try:
+        status = models.status()
         info = {
             'ai_available': AI_AVAILABLE,
             'best_model': {
-                'loaded': best_model is not None,
-                'classes': list(best_model.names.values()) if best_model else [],
+                'loaded': models.is_loaded('best'),
+                'classes': list(models.names('best').values()),
+                'class_ids': {int(k): v for k, v in models.names('best').items()},
+                'version': status.get('best', {}).get('active', {}).get('version'),
             },
             'last_model': {
-                'loaded': last_model is not None,
-                'classes': list(last_model.names.values()) if last_model else [],
+                'loaded': models.is_loaded('last'),
+                'classes': list(models.names('last').values()),
+                'class_ids': {int(k): v for k, v in models.names('last').items()},
+                'version': status.get('last', {}).get('active', {}).get('version'),
             }
         }
         return jsonify(info)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/clips/<clip_id>', methods=['GET'])
+def get_clip(clip_id):
+    """Download an incident clip (ZIP of the original frames)"""
+    status, path = clips.get(clip_id)
+    if status is None:
+        return jsonify({'success': False, 'error': 'Clip not found'}), 404
+    if status != 'ready':
+        return jsonify({'success': False, 'status': status}), 202
+    if not os.path.exists(path):
+        # Removed by retention since the status was read
+        return jsonify({'success': False, 'error': 'Clip not found'}), 404
+    return send_file(os.path.abspath(path), mimetype='application/zip', as_attachment=True,
+                     download_name=f'{clip_id}.zip')
+
+@app.route('/admin/profile', methods=['POST'])
+@require_admin
+def profile_server():
+    """Profile the live server for N seconds.
+
+    Query params: seconds (default 10), mode (cprofile|sampling),
+    format (pstats|text for cprofile; sampling always returns folded stacks).
+    """
+    seconds = request.args.get('seconds', 10, type=float)
+    mode = request.args.get('mode', 'cprofile')
+    output_format = request.args.get('format', 'pstats')
+    
+    if mode not in ('cprofile', 'sampling'):
+        return jsonify({'success': False, 'error': f'Unknown profiling mode: {mode}'}), 400
+    
+    try:
+        collected = profiler.run(seconds, mode)
+    except ProfilerBusy as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    
+    if mode == 'sampling':
+        return Response(folded_text(collected), mimetype='text/plain',
+                        headers={'Content-Disposition': 'attachment; filename=profile.folded'})
+    
+    if collected is None:
+        return jsonify({'success': False, 'error': 'No requests were handled during the session'}), 404
+    if output_format == 'text':
+        return Response(pstats_text(collected), mimetype='text/plain')
+    return Response(pstats_dump(collected), mimetype='application/octet-stream',
+                    headers={'Content-Disposition': 'attachment; filename=profile.pstats'})
+
+@app.route('/admin/tracemalloc/start', methods=['POST'])
+@require_admin
+def tracemalloc_start():
+    """Start tracing allocations and take a baseline snapshot"""
+    allocations.start(request.args.get('frames', 10, type=int))
+    return jsonify({'success': True, 'tracing': True})
+
+@app.route('/admin/tracemalloc/snapshot', methods=['GET'])
+@require_admin
+def tracemalloc_snapshot():
+    """Top allocators now and growth since the baseline"""
+    report = allocations.top(request.args.get('top', 20, type=int))
+    if report is None:
+        return jsonify({'success': False, 'error': 'tracemalloc is not running'}), 409
+    return jsonify({'success': True, **report})
+
+@app.route('/admin/tracemalloc/stop', methods=['POST'])
+@require_admin
+def tracemalloc_stop():
+    """Stop tracing allocations"""
+    allocations.stop()
+    return jsonify({'success': True, 'tracing': False})
+
+@app.route('/admin/models/reload', methods=['POST'])
+@require_admin
+def reload_model():
+    """Load new weights in the background and swap them in once warmed up"""
+    data = request.get_json(silent=True) or {}
+    name = data.get('model', 'best')
+    if name not in MODEL_FILES:
+        return jsonify({'success': False, 'error': f'Unknown model: {name}'}), 400
+    
+    path = data.get('path') or os.path.join(MODEL_DIR, MODEL_FILES[name])
+    if not models.reload_async(name, path):
+        return jsonify({'success': False, 'error': f'{name} model is already reloading'}), 409
+    return jsonify({'success': True, 'reloading': name, 'path': path}), 202
+
+@app.route('/admin/models/rollback', methods=['POST'])
+@require_admin
+def rollback_model():
+    """Swap the previous weights back in"""
+    data = request.get_json(silent=True) or {}
+    name = data.get('model', 'best')
+    try:
+        handle = models.rollback(name)
+    except KeyError as e:
+        return jsonify({'success': False, 'error': str(e.args[0])}), 409
+    return jsonify({'success': True, 'model': name, 'version': handle.version})
+
+@app.route('/admin/models/status', methods=['GET'])
+@require_admin
+def model_status():
+    """Active/previous versions and in-flight counts per model"""
+    return jsonify(models.status())
+
 if __name__ == '__main__':
     print("🚀 Starting Optimized Weapon Detection Server...")
-    print("📍 Server will run on: http://localhost:5000")
+    print(f"📍 Server will run on: http://localhost:{PORT}")
     
     if not AI_AVAILABLE:
         print("⚠️  AI packages not available - server will run in fallback mode")
@@ -238,7 +565,8 @@ if __name__ == '__main__':
             print("🔍 Real AI Detection server ready!")
         else:
             print("⚠️  Failed to load models - server will run in fallback mode")
-            print("📁 Expected model location: c:\\Users\\pdkir\\OneDrive\\Desktop\\DRDO VIT\\weaponDetection\\cctv-dashboard\\Model\\")
+            print(f"📁 Expected model location: {MODEL_DIR}")
     
+    alerts.start()
     print("🌐 Starting Flask server...")
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=PORT, debug=True)
\ No newline at end of file
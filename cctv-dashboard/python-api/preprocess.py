@@ -0,0 +1,98 @@
+"""
+Fast preprocessing path for the detection server.
+
+Frames are decoded straight to (roughly) model resolution - JPEGs use PIL's
+draft mode so libjpeg does a DCT-scaled decode instead of decoding every
+pixel - and letterboxed into preallocated NumPy buffers that are reused
+between requests. The letterbox transform is kept so detections can be
+reported in source-image coordinates.
+"""
+import base64
+import io
+import queue
+from contextlib import contextmanager
+
+import numpy as np
+from PIL import Image
+
+MODEL_SIZE = 640     # square input size the YOLO models were trained with
+PAD_VALUE = 114      # same grey ultralytics uses for letterbox padding
+
+
+class LetterboxTransform:
+    """Maps boxes between the letterboxed model input and the source image"""
+
+    def __init__(self, source_size, content_size, pad):
+        self.source_w, self.source_h = source_size
+        self.content_w, self.content_h = content_size
+        self.pad_x, self.pad_y = pad
+        self.scale_x = self.content_w / self.source_w
+        self.scale_y = self.content_h / self.source_h
+
+    def to_source(self, boxes):
+        """Convert an N x 4 array of [x1, y1, x2, y2] boxes from model input to source coordinates"""
+        boxes = boxes.astype(np.float32, copy=True)
+        boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - self.pad_x) / self.scale_x, 0, self.source_w)
+        boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - self.pad_y) / self.scale_y, 0, self.source_h)
+        return boxes
+
+    def crop_content(self, array):
+        """Cut the padding off an array laid out like the model input"""
+        return array[self.pad_y:self.pad_y + self.content_h,
+                     self.pad_x:self.pad_x + self.content_w]
+
+
+class BufferPool:
+    """Fixed set of preallocated model-input buffers shared across requests"""
+
+    def __init__(self, count, size=MODEL_SIZE):
+        self.size = size
+        self._buffers = queue.Queue()
+        for _ in range(count):
+            self._buffers.put(np.full((size, size, 3), PAD_VALUE, dtype=np.uint8))
+
+    @contextmanager
+    def acquire(self):
+        """Borrow a buffer for the duration of one request"""
+        buffer = self._buffers.get()
+        try:
+            yield buffer
+        finally:
+            self._buffers.put(buffer)
+
+
+def decode_base64(image_data):
+    """Strip an optional data URL prefix and return the raw encoded bytes"""
+    if ',' in image_data:
+        image_data = image_data.split(',')[1]
+    return base64.b64decode(image_data)
+
+
+def letterbox_into(image_bytes, buffer):
+    """Decode an encoded frame into ``buffer`` (BGR, letterboxed) and return the transform"""
+    size = buffer.shape[0]
+    image = Image.open(io.BytesIO(image_bytes))
+    source_w, source_h = image.size
+
+    ratio = min(size / source_w, size / source_h)
+    content_w = max(1, round(source_w * ratio))
+    content_h = max(1, round(source_h * ratio))
+
+    # DCT-scaled JPEG decode: libjpeg picks the smallest 1/2, 1/4 or 1/8 scale
+    # that still covers the requested size, so we never decode full resolution
+    if image.format == 'JPEG':
+        image.draft('RGB', (content_w, content_h))
+
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    if image.size != (content_w, content_h):
+        image = image.resize((content_w, content_h), Image.BILINEAR)
+
+    pad_x = (size - content_w) // 2
+    pad_y = (size - content_h) // 2
+
+    # Ultralytics treats NumPy input as BGR
+    buffer.fill(PAD_VALUE)
+    buffer[pad_y:pad_y + content_h, pad_x:pad_x + content_w] = np.asarray(image)[:, :, ::-1]
+
+    return LetterboxTransform((source_w, source_h), (content_w, content_h), (pad_x, pad_y))
@@ -0,0 +1,215 @@
+"""
+On-demand profiling for the live detection server.
+
+Two session types can run for a fixed number of seconds:
+
+* ``cprofile`` - every request handled during the session is run under its
+  own cProfile.Profile and merged into one pstats dump. From Python 3.12
+  cProfile sits on sys.monitoring, which allows one profiler per process, so
+  there a single process-wide profile runs for the whole session instead.
+* ``sampling`` - a background thread samples the stacks of all threads and
+  returns them in folded format (flamegraph.pl / speedscope compatible).
+
+tracemalloc can be started separately to compare allocations across many
+requests. When no session is active the request wrapper is a single
+attribute check, so the cost of the feature is effectively zero.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from functools import wraps
+
+MAX_SECONDS = 120          # longest session we allow on a production box
+SAMPLE_INTERVAL = 0.005    # seconds between stack samples
+PER_REQUEST_PROFILES = sys.version_info < (3, 12)
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profiling session is already running"""
+
+
+class Profiler:
+    """Runs at most one profiling session at a time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session_lock = threading.Lock()
+        self._stats = None        # pstats.Stats while a cProfile session runs
+        self.active_mode = None
+
+    def profiled(self, view):
+        """Decorator for request handlers that should show up in cProfile sessions"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if self.active_mode != 'cprofile' or not PER_REQUEST_PROFILES:
+                return view(*args, **kwargs)
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is active; profiling must never fail the request
+                return view(*args, **kwargs)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                profile.disable()
+                self._merge(profile)
+        return wrapper
+
+    def _merge(self, profile):
+        with self._lock:
+            if self._stats is None:
+                return
+            try:
+                self._stats.add(profile)
+            except TypeError:
+                # Nothing was recorded (e.g. the profile never got enabled)
+                pass
+
+    def run(self, seconds, mode='cprofile'):
+        """Profile the live process for ``seconds`` and return the collected data.
+
+        cprofile returns a pstats.Stats (or None when no request came in),
+        sampling returns a Counter of folded stacks.
+        """
+        seconds = min(max(float(seconds), 0.1), MAX_SECONDS)
+        if not self._session_lock.acquire(blocking=False):
+            raise ProfilerBusy(f'A {self.active_mode} session is already running')
+        try:
+            if mode == 'sampling':
+                return self._sample(seconds)
+            return self._cprofile(seconds)
+        finally:
+            self._session_lock.release()
+
+    def _cprofile(self, seconds):
+        if not PER_REQUEST_PROFILES:
+            return self._cprofile_process(seconds)
+        with self._lock:
+            self._stats = pstats.Stats()
+            self.active_mode = 'cprofile'
+        try:
+            time.sleep(seconds)
+        finally:
+            with self._lock:
+                stats, self._stats = self._stats, None
+                self.active_mode = None
+        return stats if stats.total_calls else None
+
+    def _cprofile_process(self, seconds):
+        """One profile for every thread (Python 3.12+, where only one may be active)"""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            raise ProfilerBusy('Another profiler is already active in this process')
+        self.active_mode = 'cprofile'
+        try:
+            time.sleep(seconds)
+        finally:
+            profile.disable()
+            self.active_mode = None
+        try:
+            stats = pstats.Stats(profile)
+        except TypeError:
+            return None
+        return stats if stats.total_calls else None
+
+    def _sample(self, seconds):
+        self.active_mode = 'sampling'
+        stacks = Counter()
+        own_thread = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        try:
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread:
+                        continue
+                    stacks[_folded_stack(frame)] += 1
+                time.sleep(SAMPLE_INTERVAL)
+        finally:
+            self.active_mode = None
+        return stacks
+
+
+def _folded_stack(frame):
+    """Render a frame chain root-first as ``file:function;file:function``"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def pstats_dump(stats):
+    """Serialize stats in the format written by ``Stats.dump_stats`` (snakeviz, python -m pstats)"""
+    return marshal.dumps(stats.stats)
+
+
+def pstats_text(stats, limit=50):
+    """Human-readable top functions by cumulative time"""
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def folded_text(stacks):
+    """Folded stacks, one ``stack count`` line each"""
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class AllocationTracker:
+    """Thin wrapper around tracemalloc with a baseline taken at start"""
+
+    def __init__(self):
+        self._baseline = None
+
+    def start(self, frames=10):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._baseline = tracemalloc.take_snapshot()
+
+    def stop(self):
+        self._baseline = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def top(self, limit=20):
+        """Top allocation sites now and compared with the baseline"""
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        report = {
+            'traced_current_bytes': current,
+            'traced_peak_bytes': peak,
+            'top_allocators': [_stat_dict(stat) for stat in snapshot.statistics('lineno')[:limit]],
+        }
+        if self._baseline is not None:
+            growth = snapshot.compare_to(self._baseline, 'lineno')[:limit]
+            report['top_growth'] = [_stat_dict(stat) for stat in growth]
+        return report
+
+
+def _stat_dict(stat):
+    frame = stat.traceback[0]
+    entry = {
+        'location': f"{frame.filename}:{frame.lineno}",
+        'size_bytes': stat.size,
+        'count': stat.count,
+    }
+    if hasattr(stat, 'size_diff'):
+        entry['size_diff_bytes'] = stat.size_diff
+        entry['count_diff'] = stat.count_diff
+    return entry
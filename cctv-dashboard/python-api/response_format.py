@@ -0,0 +1,112 @@
+"""
+Compact binary detection responses.
+
+Clients pick a format with the Accept header:
+
+* ``application/x-msgpack`` - a MessagePack map (needs the msgpack package)::
+
+      {'v': 1, 'model': 'best', 'model_version': '3bfc269594ef', 'count': N,
+       'boxes': <N*4 float32>, 'scores': <N float32>, 'class_ids': <N uint16>,
+       'image': <raw JPEG bytes or nil>, 'extra': {...}}
+
+* ``application/vnd.weapon-detection.v1`` - fixed little-endian layout::
+
+      header   magic 'WDB1' | version u8 | model u8 (0 best, 1 last) |
+               count u16 | model_version 12 ascii bytes | image_len u32
+      boxes    count * 4 float32   [x1, y1, x2, y2] in source-image pixels
+      scores   count float32
+      classes  count uint16
+      image    image_len bytes of raw JPEG (0 when no image was requested)
+
+  The fixed layout has no room for the ``extra`` fields, so they are sent as
+  response headers (``alert_dispatch`` -> ``X-Alert-Dispatch``, dicts as JSON).
+
+Class ids map to names through ``/api/models/info``, which clients fetch once
+per session. Arrays are produced straight from the result tensors, so no
+per-box Python objects are built for these formats.
+"""
+import json
+import struct
+
+import numpy as np
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+MSGPACK_TYPES = ('application/x-msgpack', 'application/msgpack')
+BINARY_TYPE = 'application/vnd.weapon-detection.v1'
+
+HEADER = struct.Struct('<4sBBH12sI')
+MAGIC = b'WDB1'
+VERSION = 1
+MODEL_CODES = {'best': 0, 'last': 1}
+
+
+def negotiate(accept_header):
+    """Return 'msgpack', 'binary' or None (JSON) for an Accept header"""
+    accept = (accept_header or '').lower()
+    if BINARY_TYPE in accept:
+        return 'binary'
+    if MSGPACK_AVAILABLE and any(t in accept for t in MSGPACK_TYPES):
+        return 'msgpack'
+    return None
+
+
+def extract_arrays(result, confidence_threshold, transform=None):
+    """Boxes (N x 4 float32, source coords), scores (float32) and class ids (uint16)"""
+    boxes = result.boxes if result is not None else None
+    if boxes is None or len(boxes) == 0:
+        return (np.zeros((0, 4), dtype=np.float32),
+                np.zeros(0, dtype=np.float32),
+                np.zeros(0, dtype=np.uint16))
+
+    xyxy = boxes.xyxy.cpu().numpy().astype(np.float32)
+    scores = boxes.conf.cpu().numpy().astype(np.float32)
+    class_ids = boxes.cls.cpu().numpy().astype(np.uint16)
+
+    keep = scores >= confidence_threshold
+    xyxy, scores, class_ids = xyxy[keep], scores[keep], class_ids[keep]
+
+    if transform is not None:
+        xyxy = transform.to_source(xyxy)
+    return xyxy, scores, class_ids
+
+
+def encode(fmt, boxes, scores, class_ids, model_type, model_version, image=None, extra=None):
+    """Serialize arrays (and an optional raw JPEG) into ``fmt``; returns (body, mimetype)"""
+    boxes = np.ascontiguousarray(boxes, dtype='<f4')
+    scores = np.ascontiguousarray(scores, dtype='<f4')
+    class_ids = np.ascontiguousarray(class_ids, dtype='<u2')
+
+    if fmt == 'msgpack':
+        body = msgpack.packb({
+            'v': VERSION,
+            'model': model_type,
+            'model_version': model_version,
+            'count': len(scores),
+            'boxes': boxes.tobytes(),
+            'scores': scores.tobytes(),
+            'class_ids': class_ids.tobytes(),
+            'image': image,
+            'extra': extra or {},
+        }, use_bin_type=True)
+        return body, MSGPACK_TYPES[0]
+
+    header = HEADER.pack(MAGIC, VERSION, MODEL_CODES.get(model_type, 0), len(scores),
+                         (model_version or '').encode('ascii')[:12], len(image or b''))
+    body = b''.join((header, boxes.tobytes(), scores.tobytes(), class_ids.tobytes(), image or b''))
+    return body, BINARY_TYPE
+
+
+def extra_headers(extra):
+    """Response headers carrying ``extra`` fields, e.g. ``{'clip': {...}}`` -> ``X-Clip: {...}``"""
+    headers = {}
+    for key, value in (extra or {}).items():
+        if value is None:
+            continue
+        name = 'X-' + '-'.join(part.capitalize() for part in key.split('_'))
+        headers[name] = json.dumps(value, separators=(',', ':')) if isinstance(value, (dict, list)) else str(value)
+    return headers
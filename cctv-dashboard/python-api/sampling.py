@@ -0,0 +1,162 @@
+"""
+Adaptive per-camera sampling intervals for the detection server.
+
+After every frame the server recommends when the camera should send the
+next one, based on what it has seen recently:
+
+- a detection (or one within INCIDENT_HOLD seconds) samples at several FPS
+- scene motion keeps the camera at ACTIVE_INTERVAL
+- quiet frames back off geometrically towards IDLE_INTERVAL
+- server load (admission queue occupancy) stretches every interval, up to
+  MAX_INTERVAL
+
+Motion is measured on a tiny grayscale thumbnail of the letterboxed frame, so
+it costs next to nothing. The interval is also enforced: frames that arrive
+well before it has elapsed are rejected with 429 and a Retry-After before
+they are decoded. Per-camera state is bounded like admission's counters
+(idle expiry and a maximum number of cameras).
+
+Configuration (environment variables, milliseconds):
+    SAMPLE_INCIDENT_MS / SAMPLE_ACTIVE_MS / SAMPLE_IDLE_MS / SAMPLE_MAX_MS
+    SAMPLE_ENFORCE                      "0" to only recommend, never reject
+"""
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from admission import AdmissionRejected, CameraTable
+
+INCIDENT_INTERVAL = 0.25   # seconds between frames while something is detected (4 FPS)
+ACTIVE_INTERVAL = 1.0      # seconds between frames while the scene is moving
+IDLE_INTERVAL = 15.0       # seconds between frames once a camera has been quiet for a while
+MAX_INTERVAL = 30.0        # cap when the server is also under load
+INCIDENT_HOLD = 10.0       # seconds a camera stays at incident rate after its last detection
+BACKOFF = 1.5              # interval growth per quiet frame
+MOTION_THRESHOLD = 6.0     # mean absolute thumbnail difference (0-255) that counts as motion
+LOAD_STRETCH = 1.0         # interval multiplier at full load is 1 + LOAD_STRETCH
+EARLY_TOLERANCE = 0.8      # frames are accepted after 80% of the interval, i.e. up to 20% early (jitter)
+THUMB_STEP = 16            # 640px letterbox -> 40x40 motion thumbnail
+
+
+def motion_thumbnail(buffer):
+    """Small grayscale copy of a HxWx3 frame for frame-to-frame motion checks"""
+    return buffer[::THUMB_STEP, ::THUMB_STEP].mean(axis=2, dtype=np.float32)
+
+
+class SampleTooEarly(AdmissionRejected):
+    """Raised when a camera sends a frame before its sampling interval has elapsed"""
+
+
+class CameraState:
+    def __init__(self):
+        self.interval = ACTIVE_INTERVAL
+        self.last_accepted = 0.0
+        self.previous_accepted = 0.0
+        self.last_detection = None
+        self.thumbnail = None
+        self.sampled = 0
+        self.throttled = 0
+
+
+class SamplingScheduler:
+    """Recommends and enforces the next-sample interval for each camera"""
+
+    def __init__(self, incident_interval=INCIDENT_INTERVAL, active_interval=ACTIVE_INTERVAL,
+                 idle_interval=IDLE_INTERVAL, max_interval=MAX_INTERVAL, enforce=True):
+        self.incident_interval = incident_interval
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+        self.max_interval = max_interval
+        self.enforce = enforce
+
+        self._lock = threading.Lock()
+        self._cameras = CameraTable(CameraState)
+
+    @classmethod
+    def from_env(cls):
+        """Build a scheduler from the SAMPLE_* environment variables"""
+        def seconds(name, default):
+            return float(os.environ.get(name, default * 1000)) / 1000
+        return cls(
+            incident_interval=seconds('SAMPLE_INCIDENT_MS', INCIDENT_INTERVAL),
+            active_interval=seconds('SAMPLE_ACTIVE_MS', ACTIVE_INTERVAL),
+            idle_interval=seconds('SAMPLE_IDLE_MS', IDLE_INTERVAL),
+            max_interval=seconds('SAMPLE_MAX_MS', MAX_INTERVAL),
+            enforce=os.environ.get('SAMPLE_ENFORCE', '1') != '0',
+        )
+
+    def check(self, camera_id, now=None):
+        """Accept a frame or raise SampleTooEarly (call before admission).
+
+        If the frame is then refused by admission, call ``cancel`` so that it
+        doesn't count against the camera's next frame.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._cameras.get(camera_id, now)
+            remaining = state.last_accepted + state.interval * EARLY_TOLERANCE - now
+            if self.enforce and remaining > 0:
+                state.throttled += 1
+                raise SampleTooEarly('Sampling interval not elapsed', 429, math.ceil(remaining))
+            state.previous_accepted, state.last_accepted = state.last_accepted, now
+            state.sampled += 1
+
+    def cancel(self, camera_id):
+        """Undo ``check`` for a frame that was never processed"""
+        with self._lock:
+            state = self._cameras.peek(camera_id)
+            if state is None:
+                return
+            state.last_accepted = state.previous_accepted
+            state.sampled -= 1
+
+    def observe(self, camera_id, detections, thumbnail=None, load=0.0, now=None):
+        """Update the camera's interval from a processed frame; returns it in milliseconds"""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._cameras.get(camera_id, now)
+
+            motion = 0.0
+            if thumbnail is not None:
+                if state.thumbnail is not None and state.thumbnail.shape == thumbnail.shape:
+                    motion = float(np.abs(thumbnail - state.thumbnail).mean())
+                state.thumbnail = thumbnail
+
+            if detections:
+                state.last_detection = now
+            if state.last_detection is not None and now - state.last_detection < INCIDENT_HOLD:
+                interval = self.incident_interval
+            elif motion >= MOTION_THRESHOLD:
+                interval = self.active_interval
+            else:
+                interval = min(max(state.interval, self.active_interval) * BACKOFF, self.idle_interval)
+
+            # Busy servers sample everyone less often, incidents included
+            interval *= 1 + LOAD_STRETCH * min(max(load, 0.0), 1.0)
+            state.interval = min(interval, self.max_interval)
+            return self._interval_ms(state)
+
+    def next_sample_ms(self, camera_id, now=None):
+        """Milliseconds until the camera's next frame is due (0 for unknown cameras)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._cameras.peek(camera_id)
+            if state is None:
+                return 0
+            return max(0, int((state.last_accepted + state.interval - now) * 1000))
+
+    def stats(self):
+        """Current interval and sampled/throttled counters per camera"""
+        with self._lock:
+            return {
+                camera: {'interval_ms': self._interval_ms(state), 'sampled': state.sampled,
+                         'throttled': state.throttled}
+                for camera, state in self._cameras.items()
+            }
+
+    @staticmethod
+    def _interval_ms(state):
+        return int(state.interval * 1000)
@@ -0,0 +1,158 @@
+"""
+Content-addressed on-disk store for annotated detection snapshots.
+
+Each snapshot is keyed by a hash of its pixels and written once as
+``<root>/<ab>/<hash>.jpg`` plus a ``<hash>.thumb.jpg`` thumbnail, so repeated
+identical frames cost nothing after the first. Entries are immutable, which
+lets the server hand them out with long-lived cache headers. The oldest
+entries are evicted when the store exceeds its size or age limit.
+"""
+import hashlib
+import io
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+MAX_BYTES = 2 * 1024 ** 3          # total size of the store
+MAX_AGE_SECONDS = 7 * 24 * 3600
+THUMBNAIL_SIZE = (320, 320)
+JPEG_QUALITY = 85
+
+_DIGEST_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class SnapshotStore:
+    """Write-once JPEG snapshots addressed by content hash"""
+
+    def __init__(self, root, max_bytes=MAX_BYTES, max_age_seconds=MAX_AGE_SECONDS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+        self._lock = threading.Lock()
+        self._index = OrderedDict()   # digest -> (bytes on disk, created), oldest first
+        self._total = 0
+        self.stats = {'stored': 0, 'deduplicated': 0, 'evicted': 0}
+
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+    @classmethod
+    def from_env(cls, instance='default'):
+        """Build a store from SNAPSHOT_DIR, SNAPSHOT_MAX_MB and SNAPSHOT_MAX_AGE_HOURS
+
+        Without SNAPSHOT_DIR snapshots go to ``snapshots/<instance>`` (the server port),
+        so servers on one box don't evict each other's entries.
+        """
+        return cls(
+            os.environ.get('SNAPSHOT_DIR') or os.path.join('snapshots', instance),
+            max_bytes=int(float(os.environ.get('SNAPSHOT_MAX_MB', MAX_BYTES / 1024 ** 2)) * 1024 ** 2),
+            max_age_seconds=float(os.environ.get('SNAPSHOT_MAX_AGE_HOURS', MAX_AGE_SECONDS / 3600)) * 3600,
+        )
+
+    def put(self, rgb_array):
+        """Store an RGB image array (if new) and return its digest"""
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(str(rgb_array.shape).encode())
+        hasher.update(np.ascontiguousarray(rgb_array))
+        digest = hasher.hexdigest()
+        with self._lock:
+            if digest in self._index:
+                self.stats['deduplicated'] += 1
+                return digest
+
+        image = Image.fromarray(rgb_array)
+        full = _encode_jpeg(image)
+        image.thumbnail(THUMBNAIL_SIZE)
+        thumb = _encode_jpeg(image)
+
+        os.makedirs(os.path.dirname(self._path(digest)), exist_ok=True)
+        _write_atomic(self._path(digest), full)
+        _write_atomic(self._path(digest, thumbnail=True), thumb)
+
+        with self._lock:
+            if digest not in self._index:
+                self._index[digest] = (len(full) + len(thumb), time.time())
+                self._total += len(full) + len(thumb)
+                self.stats['stored'] += 1
+            evicted = self._pop_expired()
+        self._delete(evicted)
+        return digest
+
+    def path(self, name):
+        """Filesystem path for ``<digest>.jpg`` / ``<digest>.thumb.jpg``, or None"""
+        thumbnail = name.endswith('.thumb.jpg')
+        digest = name[:-len('.thumb.jpg')] if thumbnail else name[:-len('.jpg')]
+        if not name.endswith('.jpg') or not _DIGEST_RE.match(digest):
+            return None
+        path = self._path(digest, thumbnail)
+        return path if os.path.exists(path) else None
+
+    def usage(self):
+        with self._lock:
+            return {'entries': len(self._index), 'bytes': self._total, **self.stats}
+
+    def _path(self, digest, thumbnail=False):
+        suffix = '.thumb.jpg' if thumbnail else '.jpg'
+        return os.path.join(self.root, digest[:2], digest + suffix)
+
+    def _pop_expired(self):
+        """Remove index entries over the age/size limits; returns their digests"""
+        evicted = []
+        cutoff = time.time() - self.max_age_seconds
+        while self._index:
+            digest, (size, created) = next(iter(self._index.items()))
+            if created >= cutoff and self._total <= self.max_bytes:
+                break
+            self._index.popitem(last=False)
+            self._total -= size
+            evicted.append(digest)
+        self.stats['evicted'] += len(evicted)
+        return evicted
+
+    def _delete(self, digests):
+        for digest in digests:
+            for thumbnail in (False, True):
+                try:
+                    os.remove(self._path(digest, thumbnail))
+                except OSError:
+                    pass
+
+    def _load_index(self):
+        """Rebuild the index from disk so limits also cover earlier runs"""
+        entries = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith('.jpg') and not name.endswith('.thumb.jpg'):
+                    digest = name[:-len('.jpg')]
+                    full = os.path.join(directory, name)
+                    size = os.path.getsize(full)
+                    thumb = self._path(digest, thumbnail=True)
+                    if os.path.exists(thumb):
+                        size += os.path.getsize(thumb)
+                    entries.append((os.path.getmtime(full), digest, size))
+        for created, digest, size in sorted(entries):
+            self._index[digest] = (size, created)
+            self._total += size
+        self._delete(self._pop_expired())
+
+
+def _encode_jpeg(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=JPEG_QUALITY)
+    return buffer.getvalue()
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,64 @@
+"""Tests for the on-demand profiler (run with ``python -m pytest test_profiling.py``)"""
+import threading
+import time
+
+import pytest
+
+import profiling
+from profiling import Profiler
+
+
+def _busy(n):
+    total = 0
+    for i in range(n):
+        total += i * i
+    time.sleep(0.05)
+    return total
+
+
+@pytest.mark.parametrize('per_request', [True, False])
+def test_concurrent_profiled_calls_during_session(monkeypatch, per_request):
+    monkeypatch.setattr(profiling, 'PER_REQUEST_PROFILES', per_request)
+    profiler = Profiler()
+    view = profiler.profiled(_busy)
+
+    session = {}
+    runner = threading.Thread(target=lambda: session.update(stats=profiler.run(0.5)))
+    runner.start()
+    while profiler.active_mode != 'cprofile':
+        time.sleep(0.01)
+
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(view(10000))
+        except Exception as e:
+            errors.append(e)
+
+    callers = [threading.Thread(target=call) for _ in range(2)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    runner.join()
+
+    assert errors == []
+    assert results == [_busy(10000)] * 2
+    if per_request:
+        assert session['stats'] is not None
+
+
+def test_request_survives_profiler_that_cannot_be_enabled(monkeypatch):
+    monkeypatch.setattr(profiling, 'PER_REQUEST_PROFILES', True)
+
+    class BusyProfile(profiling.cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            raise ValueError('Another profiling tool is already active')
+
+    monkeypatch.setattr(profiling.cProfile, 'Profile', BusyProfile)
+    profiler = Profiler()
+    profiler.active_mode = 'cprofile'
+    profiler._stats = profiling.pstats.Stats()
+
+    assert profiler.profiled(_busy)(10) == _busy(10)
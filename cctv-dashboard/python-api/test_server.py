@@ -1,157 +1,437 @@
 """
-Simple AI Detection Server Test
-This will run without external AI packages and provide simulation data
+Simulation AI Detection Server
+Runs without external AI packages and stands in for the real detection
+server with the same API contract. Latency, concurrency and faults are
+configurable so proxies, schedulers and dashboards can be load-tested:
+
+    python test_server.py --port 5001 --latency-dist lognormal --latency-ms 120 \\
+        --per-megapixel-ms 40 --concurrency 2 --error-rate 0.02 --seed 7
+
+Results are deterministic: each frame's detections, latency and faults come
+from an RNG seeded with --seed and the frame's bytes.
+
+Deadlines (X-Max-Age-Ms / max_age_ms / X-Deadline / capture timestamps),
+per-camera sampling (SAMPLE_* environment variables, X-Next-Sample-Ms) and
+the binary response formats (Accept header) reuse the real server's
+modules, so only numpy is needed on top of the standard library.
 """
-import json
+import argparse
 import base64
-import io
-import time
+import hashlib
+import json
+import math
 import random
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse, parse_qs
+import struct
 import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+from admission import AdmissionRejected, parse_camera_id, parse_deadline
+from response_format import encode, extra_headers, negotiate
+from sampling import SampleTooEarly, SamplingScheduler
+
+WEAPONS = [
+    "Handgun", "Rifle", "Knife", "Suspicious Object",
+    "Explosive Device", "Metal Weapon", "Pistol", "AK-47"
+]
+RETRY_AFTER = 1
+
+
+def image_size(image_bytes):
+    """(width, height) from a PNG or JPEG header, or None"""
+    if image_bytes[:8] == b'\x89PNG\r\n\x1a\n' and len(image_bytes) >= 24:
+        return struct.unpack('>II', image_bytes[16:24])
+    if image_bytes[:2] == b'\xff\xd8':
+        offset = 2
+        while offset + 9 < len(image_bytes):
+            if image_bytes[offset] != 0xFF:
+                offset += 1
+                continue
+            marker = image_bytes[offset + 1]
+            length = struct.unpack('>H', image_bytes[offset + 2:offset + 4])[0]
+            # SOF0..SOF15 except DHT (C4), JPG (C8) and DAC (CC) carry the frame size
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', image_bytes[offset + 5:offset + 9])
+                return width, height
+            offset += 2 + length
+    return None
+
+
+def decode_image(image_data):
+    """Raw bytes of a base64 frame (data URL prefix allowed)"""
+    if ',' in image_data:
+        image_data = image_data.split(',')[1]
+    try:
+        return base64.b64decode(image_data)
+    except (ValueError, TypeError):
+        return b''
+
+
+class Simulator:
+    """Latency model, concurrency limit and fault injection"""
+
+    def __init__(self, args):
+        self.args = args
+        self.started = time.time()
+        self._slots = threading.BoundedSemaphore(args.concurrency)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+        self.stats = {'requests': 0, 'rejected': 0, 'expired': 0, 'errors': 0, 'timeouts': 0}
+        self.sampling = SamplingScheduler.from_env()
+
+    def rng_for(self, image_bytes):
+        """Deterministic RNG for one frame"""
+        digest = hashlib.sha256(str(self.args.seed).encode() + image_bytes).digest()
+        return random.Random(int.from_bytes(digest[:8], 'big'))
+
+    def frame_cost(self, rng, size):
+        """Seconds to process one frame of the given size"""
+        args = self.args
+        base = args.latency_ms
+        if args.latency_dist == 'uniform':
+            ms = rng.uniform(base - args.latency_spread_ms, base + args.latency_spread_ms)
+        elif args.latency_dist == 'normal':
+            ms = rng.gauss(base, args.latency_spread_ms)
+        elif args.latency_dist == 'lognormal':
+            # Median stays at latency_ms, spread controls the tail
+            sigma = args.latency_spread_ms / base if base else 0
+            ms = base * math.exp(rng.gauss(0, sigma))
+        else:
+            ms = base
+
+        if size is not None:
+            ms += args.per_megapixel_ms * (size[0] * size[1]) / 1e6
+        return max(ms, 0) / 1000.0
+
+    def batch_cost(self, frame_costs):
+        """Batches are cheaper than frames one by one: mean cost * n ** batch_exponent"""
+        if not frame_costs:
+            return 0.0
+        n = len(frame_costs)
+        return (sum(frame_costs) / n) * n ** self.args.batch_exponent
+
+    def slow_start_factor(self):
+        """Latency multiplier while the server is 'warming up'"""
+        if time.time() - self.started < self.args.slow_start_seconds:
+            return self.args.slow_start_factor
+        return 1.0
+
+    def acquire(self):
+        """Take an inference slot; False when the wait queue is full"""
+        with self._lock:
+            if self.active >= self.args.concurrency and self.waiting >= self.args.queue:
+                self.stats['rejected'] += 1
+                return False
+            self.waiting += 1
+        self._slots.acquire()
+        with self._lock:
+            self.waiting -= 1
+            self.active += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+        self._slots.release()
+
+    def load(self):
+        """Fraction of slots and queue places in use (0.0 - 1.0)"""
+        with self._lock:
+            return (self.active + self.waiting) / (self.args.concurrency + self.args.queue)
+
+    def detections(self, rng, size):
+        """Random but repeatable detections for one frame"""
+        width, height = size or (640, 480)
+        detections = []
+        if rng.random() < self.args.detection_rate:
+            for _ in range(rng.randint(1, 2)):
+                x1 = rng.uniform(0, width * 0.8)
+                y1 = rng.uniform(0, height * 0.8)
+                detections.append({
+                    'class': rng.choice(WEAPONS),
+                    'confidence': rng.uniform(0.5, 0.95),
+                    'bbox': [x1, y1,
+                             min(width, x1 + rng.uniform(0.05, 0.2) * width),
+                             min(height, y1 + rng.uniform(0.05, 0.2) * height)]
+                })
+        return detections
+
 
 class DetectionHandler(BaseHTTPRequestHandler):
+    simulator = None
+
     def do_OPTIONS(self):
         """Handle CORS preflight requests"""
         self.send_response(200)
         self._set_cors_headers()
         self.end_headers()
-    
+
     def do_GET(self):
         """Handle GET requests"""
         parsed_path = urlparse(self.path)
-        
+        sim = self.simulator
+
         if parsed_path.path == '/health':
-            self.send_response(200)
-            self._set_cors_headers()
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            
-            response = {
+            with sim._lock:
+                admission = {
+                    'active': sim.active,
+                    'waiting': sim.waiting,
+                    'max_concurrent': sim.args.concurrency,
+                    'max_queue': sim.args.queue,
+                }
+            self._send_json(200, {
                 'status': 'healthy',
                 'ai_available': False,
+                # Simulated models are always ready, so the coordinator routes to this node
                 'models_loaded': {
-                    'best_model': False,
-                    'last_model': False
+                    'best_model': True,
+                    'last_model': True
                 },
+                'admission': admission,
+                'sampling': sim.sampling.stats(),
+                'simulation': dict(sim.stats),
                 'mode': 'simulation'
-            }
-            self.wfile.write(json.dumps(response).encode())
-            
+            })
+
         elif parsed_path.path == '/api/models/info':
-            self.send_response(200)
-            self._set_cors_headers()
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            
-            response = {
+            self._send_json(200, {
                 'ai_available': False,
-                'best_model': {'loaded': False, 'classes': []},
-                'last_model': {'loaded': False, 'classes': []},
+                'best_model': {'loaded': True, 'classes': WEAPONS,
+                               'class_ids': dict(enumerate(WEAPONS)), 'version': 'simulation'},
+                'last_model': {'loaded': True, 'classes': WEAPONS,
+                               'class_ids': dict(enumerate(WEAPONS)), 'version': 'simulation'},
                 'mode': 'simulation'
-            }
-            self.wfile.write(json.dumps(response).encode())
+            })
         else:
             self.send_response(404)
             self.end_headers()
-    
+
     def do_POST(self):
         """Handle POST requests"""
-        if self.path == '/api/detect-weapons':
+        if self.path != '/api/detect-weapons':
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        sim = self.simulator
+        try:
+            content_length = int(self.headers['Content-Length'])
+            post_data = self.rfile.read(content_length)
+            data = json.loads(post_data.decode('utf-8'))
+            camera_id = parse_camera_id(self.headers, data)
+            deadline = parse_deadline(self.headers, data)
+            sampled = camera_id != 'unknown'
+
+            # A single 'image' keeps the real server's contract; 'images' simulates a batch
+            frames = data.get('images') or [data.get('image', '')]
+            frame_bytes = [decode_image(frame or '') for frame in frames]
+            rng = sim.rng_for(b''.join(frame_bytes))
+            sizes = [image_size(b) for b in frame_bytes]
+
+            with sim._lock:
+                sim.stats['requests'] += 1
+
+            # Frames sent before the camera's recommended interval are refused up front
+            if sampled:
+                try:
+                    sim.sampling.check(camera_id)
+                except AdmissionRejected as e:
+                    self._send_rejection(e, camera_id)
+                    return
+
+            # Fault injection, decided up front so the same frame always fails the same way
+            roll = rng.random()
+            if roll < sim.args.error_rate:
+                with sim._lock:
+                    sim.stats['errors'] += 1
+                self._send_json(500, {
+                    'success': False,
+                    'error': 'Simulated internal error',
+                    'fallback': True,
+                    'mode': 'simulation'
+                })
+                return
+            hang = roll < sim.args.error_rate + sim.args.timeout_rate
+
+            if not sim.acquire():
+                if sampled:
+                    sim.sampling.cancel(camera_id)
+                self._send_rejection(AdmissionRejected('Server busy, queue is full', 429, RETRY_AFTER),
+                                     camera_id)
+                return
+
             try:
-                content_length = int(self.headers['Content-Length'])
-                post_data = self.rfile.read(content_length)
-                data = json.loads(post_data.decode('utf-8'))
-                
-                # Simulate AI detection processing time
-                time.sleep(random.uniform(0.5, 1.5))
-                
-                # Simulate weapon detection results
-                weapons = [
-                    "Handgun", "Rifle", "Knife", "Suspicious Object", 
-                    "Explosive Device", "Metal Weapon", "Pistol", "AK-47"
-                ]
-                
-                # Random chance of detection
-                detection_chance = random.random()
-                detections = []
-                
-                if detection_chance > 0.3:  # 70% chance of detection
-                    num_detections = random.randint(1, 2)
-                    for i in range(num_detections):
-                        weapon_type = random.choice(weapons)
-                        confidence = random.uniform(0.5, 0.95)
-                        
-                        # Random bounding box
-                        x1, y1 = random.randint(50, 200), random.randint(50, 200)
-                        x2, y2 = x1 + random.randint(50, 150), y1 + random.randint(50, 150)
-                        
-                        detections.append({
-                            'class': weapon_type,
-                            'confidence': confidence,
-                            'bbox': [x1, y1, x2, y2]
-                        })
-                
-                self.send_response(200)
-                self._set_cors_headers()
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                
+                # Like the real server, frames that went stale while queued are dropped
+                if deadline is not None and deadline <= time.time():
+                    with sim._lock:
+                        sim.stats['expired'] += 1
+                    if sampled:
+                        sim.sampling.cancel(camera_id)
+                    self._send_rejection(AdmissionRejected('Frame deadline passed before decode', 503,
+                                                           RETRY_AFTER), camera_id)
+                    return
+                if hang:
+                    with sim._lock:
+                        sim.stats['timeouts'] += 1
+                    time.sleep(sim.args.timeout_ms / 1000.0)
+                cost = sim.batch_cost([sim.frame_cost(rng, size) for size in sizes])
+                time.sleep(cost * sim.slow_start_factor())
+            finally:
+                sim.release()
+
+            results = [sim.detections(rng, size) for size in sizes]
+            next_sample_ms = None
+            if sampled:
+                next_sample_ms = sim.sampling.observe(camera_id, any(results), load=sim.load())
+            headers = extra_headers({'next_sample_ms': next_sample_ms})
+
+            print(f"🎯 Simulated detection: {sum(len(d) for d in results)} weapons "
+                  f"in {len(frames)} frame(s), {cost * 1000:.0f} ms")
+
+            response_format = negotiate(self.headers.get('Accept'))
+            if response_format is not None and 'images' not in data:
+                detections = results[0]
+                body, mimetype = encode(
+                    response_format,
+                    [d['bbox'] for d in detections],
+                    [d['confidence'] for d in detections],
+                    [WEAPONS.index(d['class']) for d in detections],
+                    'last' if data.get('model') == 'last' else 'best', 'simulation',
+                    extra={'next_sample_ms': next_sample_ms})
+                self._send(200, body, mimetype, headers)
+                return
+
+            if 'images' in data:
                 response = {
                     'success': True,
-                    'detections': detections,
-                    'annotated_image': data.get('image'),  # Return original image
+                    'results': [{'detections': d, 'total_detections': len(d)} for d in results],
                     'model_used': data.get('model', 'simulation'),
-                    'total_detections': len(detections),
+                    'model_version': 'simulation',
+                    'next_sample_ms': next_sample_ms,
                     'mode': 'simulation'
                 }
-                
-                print(f"🎯 Simulated detection: Found {len(detections)} weapons")
-                
-                self.wfile.write(json.dumps(response).encode())
-                
-            except Exception as e:
-                print(f"❌ Error in detection: {e}")
-                self.send_response(500)
-                self._set_cors_headers()
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                
+            else:
                 response = {
-                    'success': False,
-                    'error': f'Detection failed: {str(e)}',
+                    'success': True,
+                    'detections': results[0],
+                    'annotated_image': data.get('image'),  # Return original image
+                    'model_used': data.get('model', 'simulation'),
+                    'model_version': 'simulation',
+                    'total_detections': len(results[0]),
+                    'next_sample_ms': next_sample_ms,
                     'mode': 'simulation'
                 }
-                self.wfile.write(json.dumps(response).encode())
-        else:
-            self.send_response(404)
-            self.end_headers()
-    
+
+            self._send_json(200, response, headers)
+
+        except Exception as e:
+            print(f"❌ Error in detection: {e}")
+            self._send_json(500, {
+                'success': False,
+                'error': f'Detection failed: {str(e)}',
+                'mode': 'simulation'
+            })
+
+    def _send_rejection(self, rejection, camera_id):
+        """429/503 with Retry-After and the camera's next sample time, as the real server sends"""
+        next_sample_ms = None
+        if camera_id != 'unknown':
+            next_sample_ms = self.simulator.sampling.next_sample_ms(camera_id)
+            if not isinstance(rejection, SampleTooEarly):
+                next_sample_ms = max(next_sample_ms, rejection.retry_after * 1000)
+        headers = {'Retry-After': str(rejection.retry_after)}
+        headers.update(extra_headers({'next_sample_ms': next_sample_ms}))
+        self._send_json(rejection.status_code, {
+            'success': False,
+            'error': rejection.reason,
+            'retry_after': rejection.retry_after,
+            'next_sample_ms': next_sample_ms,
+            'mode': 'simulation'
+        }, headers)
+
+    def _send_json(self, status, body, headers=None):
+        """Send a JSON response with CORS headers"""
+        self._send(status, json.dumps(body).encode(), 'application/json', headers)
+
+    def _send(self, status, payload, content_type, headers=None):
+        """Send a response body with CORS headers"""
+        self.send_response(status)
+        self._set_cors_headers()
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
     def _set_cors_headers(self):
         """Set CORS headers"""
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-    
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Camera-Id, X-Max-Age-Ms, '
+                                                         'X-Deadline, X-Capture-Timestamp')
+
     def log_message(self, format, *args):
         """Override to provide custom logging"""
         print(f"🌐 {format % args}")
 
-def start_server():
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Simulated weapon detection server')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0, help='seed for deterministic results')
+
+    latency = parser.add_argument_group('latency model')
+    latency.add_argument('--latency-dist', choices=['fixed', 'uniform', 'normal', 'lognormal'],
+                         default='uniform')
+    latency.add_argument('--latency-ms', type=float, default=1000.0, help='base per-frame latency')
+    latency.add_argument('--latency-spread-ms', type=float, default=500.0,
+                         help='half-width (uniform), std dev (normal) or tail spread (lognormal)')
+    latency.add_argument('--per-megapixel-ms', type=float, default=0.0,
+                         help='extra latency per megapixel of input')
+    latency.add_argument('--batch-exponent', type=float, default=1.0,
+                         help='batch cost = mean frame cost * n ** exponent (1.0 = no batching gain)')
+    latency.add_argument('--slow-start-seconds', type=float, default=0.0,
+                         help='how long after start-up requests are slowed down')
+    latency.add_argument('--slow-start-factor', type=float, default=5.0,
+                         help='latency multiplier during slow start')
+
+    capacity = parser.add_argument_group('capacity')
+    capacity.add_argument('--concurrency', type=int, default=1, help='frames processed at once')
+    capacity.add_argument('--queue', type=int, default=8, help='requests allowed to wait before 429')
+
+    faults = parser.add_argument_group('fault injection')
+    faults.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests failing with 500')
+    faults.add_argument('--timeout-rate', type=float, default=0.0, help='fraction of requests that hang')
+    faults.add_argument('--timeout-ms', type=float, default=60000.0, help='how long hanging requests hang')
+    faults.add_argument('--detection-rate', type=float, default=0.7, help='fraction of frames with weapons')
+    return parser.parse_args(argv)
+
+
+def start_server(args=None):
     """Start the detection server"""
-    server_address = ('localhost', 5000)
-    httpd = HTTPServer(server_address, DetectionHandler)
-    
+    args = args or parse_args()
+    DetectionHandler.simulator = Simulator(args)
+    server_address = (args.host, args.port)
+    httpd = ThreadingHTTPServer(server_address, DetectionHandler)
+
     print("🚀 Starting Simple AI Detection Server...")
-    print("📍 Server running at: http://localhost:5000")
+    print(f"📍 Server running at: http://{args.host}:{args.port}")
     print("⚠️  Running in simulation mode (no real AI)")
+    print(f"⏱️  Latency: {args.latency_dist} {args.latency_ms:.0f}±{args.latency_spread_ms:.0f} ms "
+          f"+ {args.per_megapixel_ms:.0f} ms/MP, concurrency {args.concurrency}, seed {args.seed}")
+    if args.error_rate or args.timeout_rate or args.slow_start_seconds:
+        print(f"💥 Faults: {args.error_rate:.0%} errors, {args.timeout_rate:.0%} timeouts, "
+              f"{args.slow_start_seconds:.0f}s slow start")
     print("🔍 API endpoints:")
     print("   GET  /health - Health check")
     print("   POST /api/detect-weapons - Weapon detection")
     print("   GET  /api/models/info - Model information")
     print("✅ Server ready!")
-    
+
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
@@ -159,4 +439,4 @@ def start_server():
         httpd.shutdown()
 
 if __name__ == '__main__':
-    start_server()
\ No newline at end of file
+    start_server()
@@ -1,29 +1,57 @@
 import { NextRequest, NextResponse } from 'next/server';
 
+// Detection server or coordinator (python-api/coordinator.py) fronting several of them
+const DETECT_SERVER_URL = process.env.DETECT_SERVER_URL || 'http://localhost:5000';
+
 export async function POST(request: NextRequest) {
   try {
-    const body = await request.json();
+    const body = await request.text();
+    const accept = request.headers.get('Accept') || 'application/json';
+    const cameraId = request.headers.get('X-Camera-Id');
     
     // Add timeout to prevent hanging
     const controller = new AbortController();
     const timeoutId = setTimeout(() => controller.abort(), 30000); // 30 second timeout
     
     // Forward request to Python AI detection server
-    const response = await fetch('http://localhost:5000/api/detect-weapons', {
+    const response = await fetch(`${DETECT_SERVER_URL}/api/detect-weapons`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        'Accept': accept, // Lets clients negotiate the compact binary format
+        // Lets the coordinator route by camera without parsing the body
+        ...(cameraId ? { 'X-Camera-Id': cameraId } : {}),
       },
-      body: JSON.stringify(body),
+      body,
       signal: controller.signal
     });
     
     clearTimeout(timeoutId);
     
+    // Pass admission rejections (queue full / stale frame) straight back to the client
+    if (response.status === 429 || response.status === 503) {
+      const rejection = await response.json();
+      return NextResponse.json(rejection, {
+        status: response.status,
+        headers: { 'Retry-After': response.headers.get('Retry-After') || '1' }
+      });
+    }
+    
     if (!response.ok) {
       throw new Error(`Detection server responded with status: ${response.status}`);
     }
     
+    // Compact binary formats are passed through untouched, with the extras the server sends as headers
+    const contentType = response.headers.get('Content-Type') || '';
+    if (!contentType.includes('application/json')) {
+      const headers: Record<string, string> = { 'Content-Type': contentType };
+      for (const name of ['X-Next-Sample-Ms', 'X-Alert-Dispatch', 'X-Clip']) {
+        const value = response.headers.get(name);
+        if (value) headers[name] = value;
+      }
+      return new NextResponse(response.body, { status: response.status, headers });
+    }
+    
     const result = await response.json();
     
     // Log detection results for debugging
@@ -67,7 +95,7 @@ export async function POST(request: NextRequest) {
 export async function GET() {
   try {
     // Health check - ping the Python server
-    const response = await fetch('http://localhost:5000/health', {
+    const response = await fetch(`${DETECT_SERVER_URL}/health`, {
       method: 'GET',
       headers: {
         'Content-Type': 'application/json',
@@ -34,6 +34,23 @@ function guessMimeFromPath(p = "") {
   return "application/octet-stream";
 }
 
+const DETECT_SERVER_URL = (process.env.DETECT_SERVER_URL || "http://localhost:5000").replace(/\/+$/, "");
+
+// Snapshot URLs may only point at the detection server (the URL comes from the request body)
+const SNAPSHOT_PREFIXES = [DETECT_SERVER_URL, process.env.SNAPSHOT_BASE_URL]
+  .filter(Boolean)
+  .map((base) => new URL(`${base.replace(/\/+$/, "")}/snapshots/`).href);
+
+function isSnapshotUrl(src) {
+  let url;
+  try {
+    url = new URL(src); // normalises "..", so the prefix check can't be walked out of
+  } catch {
+    return false;
+  }
+  return SNAPSHOT_PREFIXES.some((prefix) => url.href.startsWith(prefix));
+}
+
 async function prepareAttachmentFromSrc(src, filenameBase = "frame") {
   if (typeof src === "string" && src.startsWith("data:")) {
     const parsed = parseDataUrl(src);
@@ -45,6 +62,23 @@ async function prepareAttachmentFromSrc(src, filenameBase = "frame") {
       Base64Content: parsed.buffer.toString("base64"),
     };
   }
+  // The detection server hands out root-relative snapshot links (proxied by the dashboard)
+  if (typeof src === "string" && src.startsWith("/snapshots/")) {
+    src = `${DETECT_SERVER_URL}${src}`;
+  }
+  // Snapshot URLs served by the Python detection server
+  if (typeof src === "string" && /^https?:\/\//i.test(src)) {
+    if (!isSnapshotUrl(src)) throw new Error("Image URL is not a detection server snapshot.");
+    const res = await fetch(src, { redirect: "error" });
+    if (!res.ok) throw new Error(`Failed to fetch image: ${res.status}`);
+    const mime = res.headers.get("content-type") || guessMimeFromPath(new URL(src).pathname);
+    const ext = (mime.split("/")[1] || "bin").toLowerCase();
+    return {
+      ContentType: mime,
+      Filename: `${filenameBase}.${ext}`,
+      Base64Content: Buffer.from(await res.arrayBuffer()).toString("base64"),
+    };
+  }
   const buf = await fs.readFile(src);
   const mime = guessMimeFromPath(src);
   const ext = (mime.split("/")[1] || "bin").toLowerCase();